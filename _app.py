@@ -1,5 +1,7 @@
 import dash
+import flask
 import os
+from _utilities import clientside_tables_path, get_clientside_tables_js
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
@@ -9,3 +11,10 @@ server.secret_key = os.environ.get('secret_key', 'secret')
 app.config.suppress_callback_exceptions = True
 app.title = 'NEUIT'
 
+# The option tables of the clientside callbacks in 'assets/neuit.js', loaded before them at the path prefix of the app
+app.config.external_scripts.append(app.get_relative_path('/' + clientside_tables_path))
+
+
+@server.route(app.config.routes_pathname_prefix + clientside_tables_path)
+def clientside_tables():
+    return flask.Response(get_clientside_tables_js(), mimetype='application/javascript')
@@ -1,14 +1,32 @@
 import os
+import copy
+import functools
+import hashlib
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+from urllib.parse import urlencode
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import glob
 
 import ImagingReso._utilities as ir_util
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table as dt
+import plotly.graph_objs as go
+from dash import no_update
+from dash.exceptions import PreventUpdate
 import pandas as pd
 import io
 import base64
 from ImagingReso.resonance import Resonance
 from scipy.interpolate import interp1d
+from scipy.optimize import brentq
 import numpy as np
 import json
 from cerberus import Validator
@@ -117,6 +135,107 @@ empty_div = html.Div()
 distance_default = 16.45  # in meter
 delay_default = 0  # in us
 plot_loading = html.H2('Plot loading...')
+plot_width_px = 900
+plot_max_points = 4 * plot_width_px  # per curve sent to the browser, 2 points per bucket of half a pixel
+plot_colorway = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                 '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']  # matplotlib default colors
+
+# Option tables of the plot and input toggles, shared with the clientside callbacks by 'get_clientside_tables_js'
+x_type_list = ['energy', 'lambda', 'time']
+y_type_list = ['transmission', 'attenuation', 'mu_per_cm', 'sigma', 'sigma_raw']
+fixed_y_type_list = ['attenuation', 'transmission']  # linear y axis over 'fixed_y_range'
+fixed_y_range = [-0.05, 1.05]
+show_opt_label_dict = OrderedDict([('total', 'Total'), ('layer', 'Layer'), ('ele', 'Element'), ('iso', 'Isotope')])
+plot_scale_label_dict = OrderedDict([('linear', 'Linear'), ('logx', 'Log x'), ('logy', 'Log y'), ('loglog', 'Loglog')])
+band_unit_dict = {'energy': 'eV', 'lambda': '\u212B'}
+band_hidden_beamline_list = ['imaging', 'imaging_crop']
+clientside_tables_path = 'neuit/tables.js'  # under the path prefixes of the app, see '_app.py'
+
+beamline_name_dict = {'imaging': 'IMAGING (CG-1D), HFIR',
+                      'imaging_crop': u'IMAGING (CG-1D) \u2264 5.35 \u212B, HFIR',
+                      'snap': 'SNAP (BL-3), SNS',
+                      'venus': 'VENUS (BL-10), SNS',
+                      }
+beamline_col_name = 'Beam spectrum'
+trans_total_name = 'Transmission (total, %)'
+atten_total_name = 'Attenuation (total, %)'
+target_trans_name = 'Target transmission (%)'
+
+# Built Resonance objects are cached per worker, limited by count and by memory
+reso_cache_max_items = int(os.environ.get('NEUIT_RESO_CACHE_ITEMS', 32))
+reso_cache_max_bytes = int(os.environ.get('NEUIT_RESO_CACHE_MB', 256)) * 1024 ** 2
+_reso_cache = OrderedDict()
+_reso_cache_lock = threading.Lock()
+
+# Cross-sections of all isotopes packed in one binary file, memory-mapped by every worker
+ir_ref_data_path = os.path.join(os.path.abspath(os.path.dirname(ir_util.__file__)), 'reference_data')
+xs_store_path = os.environ.get('NEUIT_XS_STORE', os.path.join(ir_ref_data_path, '_packed_xs'))
+xs_store_database_list = ['ENDF_VII', 'ENDF_VIII', 'Bonded_H']
+_xs_store = {}
+_ir_get_database_data = ir_util.get_database_data
+
+# Results of app2 kept per worker and written through to disk, only their ids go to the browser
+result_store_dir = os.environ.get('NEUIT_RESULT_DIR', os.path.join(tempfile.gettempdir(), 'neuit_results'))
+result_cache_max_items = int(os.environ.get('NEUIT_RESULT_CACHE_ITEMS', 16))
+result_store_max_age_s = int(os.environ.get('NEUIT_RESULT_MAX_AGE_H', 24)) * 3600
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+_result_store_last_cleanup = 0
+result_store_enabled = os.environ.get('NEUIT_RESULT_STORE', '1') != '0'
+result_meta_key = '_meta'
+
+# Beam spectra, loaded on first use
+_main_path = os.path.abspath(os.path.dirname(__file__))
+beam_shape_path_dict = {'imaging': 'static/instrument_file/beam_flux_cg1d.txt',
+                        'imaging_crop': 'static/instrument_file/beam_flux_cg1d_crop.txt',
+                        'snap': 'static/instrument_file/beam_flux_snap.txt',
+                        'venus': 'static/instrument_file/beam_flux_venus.txt',
+                        }
+_beam_shape_registry = {}
+
+# Adaptive energy grid of the flux weighted transmission
+adaptive_tol_default = 0.001  # in % transmission
+adaptive_max_points_default = 5000
+adaptive_seed_points = 100
+_raw_sigma_cache = {}
+
+# Integration backends of the flux weighted transmission
+integration_method_list = ['trapz', 'log_trapz', 'simpson', 'gauss']
+gauss_order = 10
+
+linear_nbr_point = 100  # energies of the linear grid of ImagingReso in 'calculate_transmission'
+# Quadrature of the transmission shown by app1, within 1e-3 % of a converged reference (see the unit tests)
+quadrature_integration = 'simpson'
+quadrature_nbr_point = 201
+
+adaptive_beamline_list = ['snap']  # integrated on the adaptive grid in app1, the others with 'quadrature_integration'
+
+# Comparison of all beam spectra, computed in a process pool started on first use
+transmission_pool_workers = int(os.environ.get('NEUIT_POOL_WORKERS',
+                                               min(len(beam_shape_path_dict), os.cpu_count() or 1)))
+_transmission_pool = None
+thickness_solve_max = 1e4  # in mm
+
+# Above this number of energy points, app2 first shows a coarse preview and refines the zoomed windows
+progressive_max_points = int(os.environ.get('NEUIT_PROGRESSIVE_POINTS', 20001))
+# Exports of these results are recalculated while streamed, so they must fit in the request timeout of a worker
+progressive_export_max_points = int(os.environ.get('NEUIT_EXPORT_POINTS', 200001))
+
+# Results of app2 are computed as jobs in a process pool, their state is shared with the other workers on disk
+reso_job_workers = int(os.environ.get('NEUIT_JOB_WORKERS', 2))
+reso_job_chunk_points = 5000  # energy points computed between two progress updates
+reso_job_poll_ms = 500
+reso_level_list = ['total', 'layer', 'ele', 'iso']  # column levels of a resonance result, as in 'show_opt'
+_reso_job_pool = None
+_reso_job_future_dict = {}
+
+chem_name_cache_size = 512  # chemical formulas kept parsed, by (formula, database)
+
+# Edits and uploads of the sample table are debounced: the isotope table is updated once they stop for this delay
+iso_update_delay_ms = 400
+
+# Plot data of app2 are streamed as csv by a route of the server (see 'iter_reso_csv')
+reso_export_path = 'export/resonance/{}.csv'  # under the path prefixes of the app
 
 
 class MyValidator(Validator):
@@ -182,12 +301,56 @@ class MyValidator(Validator):
 
 
 def _validate_chem_name(input_name: str, database: str):
-    """ Returns True if string is a number. """
+    """ Returns [True, None] if string is a valid chemical formula in 'database', else [False, error message]. """
+    _error = _parse_chem_name(input_name, database)[2]
+    return [_error is None, _error]
+
+
+@functools.lru_cache(maxsize=chem_name_cache_size)
+def _parse_chem_name(input_name: str, database: str):
+    """ Returns (elements, stoichiometric ratios, None) of a chemical formula,
+    or (None, None, error message) if it is not valid in 'database'.
+
+    Results are cached, the same formulas are parsed by the validation and the density check on every submit.
+    """
     try:
-        ir_util.formula_to_dictionary(formula=input_name, database=database)
-        return [True, None]
+        _parsed_dict = ir_util.formula_to_dictionary(formula=input_name, database=database)[input_name]
+        return tuple(_parsed_dict['elements']), tuple(_parsed_dict['stoichiometric_ratio']), None
     except ValueError as error_massage:
-        return [False, error_massage.__str__()]
+        return None, None, error_massage.__str__()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_iso_metadata(element: str, database: str):
+    """ Returns (isotopes, natural isotopic ratios, molar masses) of an element in 'database'.
+
+    Only the file names of the database are listed, no cross-section is loaded, and each element is read once.
+    """
+    _iso_dict = ir_util.get_isotope_dicts(element=element, database=database)['isotopes']
+    return tuple(_iso_dict['list']), tuple(_iso_dict['isotopic_ratio']), tuple(_iso_dict['mass']['value'])
+
+
+@functools.lru_cache(maxsize=chem_name_cache_size)
+def _form_iso_rows(layer: str, database: str):
+    """ Returns the rows (layer, element, isotope, natural isotopic ratio) of one layer of the isotope table,
+    or () if the layer can not be added to the stack.
+
+    The rows only depend on the formula of a sample row, so editing the thickness or the density of a layer,
+    or any other layer, reuses the cached rows.
+    """
+    current_ele_list = _parse_chem_name(layer, database)[0]
+    if current_ele_list is None:
+        return ()
+    try:
+        current_iso_dict = {each_ele: _get_iso_metadata(each_ele, database) for each_ele in current_ele_list}
+    except ValueError:  # e.g. no natural isotopic ratios in 'database'
+        return ()
+    _rows = []
+    for each_ele in current_ele_list:
+        current_iso_list, current_iso_ratio_list = current_iso_dict[each_ele][:2]
+        for i, each_iso in enumerate(current_iso_list):
+            _rows.append((layer, each_ele, each_iso, round(current_iso_ratio_list[i], 4)))
+    return tuple(_rows)
 
 
 def is_number(s):
@@ -199,6 +362,8 @@ def is_number(s):
         return False
 
 
+chem_name_rule_list = ['ENDF_VIII', 'ENDF_VII']  # databases with a chemical formula rule in 'MyValidator'
+
 compos_dict_schema = {
     # chem_name: {'type': 'string', 'empty': False, 'required': True, 'is_chem_name': True, },
     chem_name: {'type': 'string', 'empty': False, 'required': True, 'ENDF_VIII': True, },
@@ -277,18 +442,20 @@ def creat_sample_df_from_compos_df(compos_tb_df):
 
 def force_dict_to_numeric(input_dict_list: list):
     input_df = pd.DataFrame(input_dict_list)
-    input_dict = input_df.to_dict('list')
-    keys = input_dict.keys()
     output_dict = {}
-    for each_key in keys:
-        _current_list = input_dict[each_key]
-        _current_output_list = []
-        for each_item in _current_list:
-            if is_number(each_item):
-                _current_output_list.append(float(each_item))
-            else:
-                _current_output_list.append(each_item)
-        output_dict[each_key] = _current_output_list
+    for each_key in input_df.columns:
+        _current_col = input_df[each_key]
+        _current_output_array = _current_col.to_numpy(dtype=object, copy=True)
+        _numeric_col = pd.to_numeric(_current_col, errors='coerce')
+        _converted = _numeric_col.notna().to_numpy()
+        _current_output_array[_converted] = _numeric_col.to_numpy(dtype=float)[_converted]
+        # Strings pandas does not parse (e.g. 'nan' or '1_000') are left to 'is_number'
+        _left_index = np.flatnonzero(~_converted & (_current_col.map(type) == str).to_numpy())
+        _left_number_dict = {each_item: is_number(each_item) for each_item in set(_current_output_array[_left_index])}
+        for _index in _left_index:
+            if _left_number_dict[_current_output_array[_index]]:
+                _current_output_array[_index] = float(_current_output_array[_index])
+        output_dict[each_key] = _current_output_array.tolist()
     return output_dict
 
 
@@ -371,23 +538,20 @@ def validate_sum_of_iso_ratio(iso_df: pd.DataFrame):
         return [False], [None]
 
 
-def validate_density_input(sample_tb_df: pd.DataFrame, test_passed_list: list, output_div_list: list):
+def validate_density_input(sample_tb_df: pd.DataFrame, database: str, test_passed_list: list, output_div_list: list):
     # Test density input required or not
     for _index, _each_formula in enumerate(sample_tb_df[chem_name]):
-        try:
-            _parsed_dict = ir_util.formula_to_dictionary(_each_formula)
-            _num_of_ele_in_formula = len(_parsed_dict[_each_formula]['elements'])
-            if _num_of_ele_in_formula > 1 and sample_tb_df[density_name][_index] == '':
-                test_passed_list.append(False)
-                output_div_list.append(
-                    html.P("INPUT ERROR: '{}': ['Density input is required for compound '{}'.']".format(density_name,
-                                                                                                        _each_formula)))
-            else:
-                test_passed_list.append(True)
-                output_div_list.append(None)
-        except ValueError:
-            test_passed_list = test_passed_list
-            output_div_list = output_div_list
+        _ele_list, _ratio_list, _error = _parse_chem_name(_each_formula, database)
+        if _error is not None:
+            continue
+        if len(_ele_list) > 1 and sample_tb_df[density_name][_index] == '':
+            test_passed_list.append(False)
+            output_div_list.append(
+                html.P("INPUT ERROR: '{}': ['Density input is required for compound '{}'.']".format(density_name,
+                                                                                                    _each_formula)))
+        else:
+            test_passed_list.append(True)
+            output_div_list.append(None)
 
     return test_passed_list, output_div_list
 
@@ -413,6 +577,20 @@ def validate_energy_input(range_tb_df: pd.DataFrame, test_passed_list: list, out
     return test_passed_list, output_div_list
 
 
+def validate_target_trans_input(target_trans, test_passed_list: list, output_div_list: list):
+    if target_trans is None:  # optional input
+        test_passed_list.append(True)
+        output_div_list.append(None)
+    elif target_trans <= 0 or target_trans >= 100:
+        test_passed_list.append(False)
+        output_div_list.append(
+            html.P("INPUT ERROR: '{}': ['0 < 'Target' < 100' is required!]".format(target_trans_name)))
+    else:
+        test_passed_list.append(True)
+        output_div_list.append(None)
+    return test_passed_list, output_div_list
+
+
 def validate_band_width_input(beamline, band_width, band_type, test_passed_list: list, output_div_list: list):
     if beamline in ['imaging', 'imaging_crop']:
         test_passed_list.append(True)
@@ -487,18 +665,79 @@ def validate_band_width_input(beamline, band_width, band_type, test_passed_list:
 
 
 def validate_input_tb_rows(schema: dict, input_df: pd.DataFrame):
-    input_dict_list = input_df.to_dict('records')
-    v = MyValidator(schema)
-    # v = Validator(schema)
-    passed_list = []
-    div_list = []
-    for each_input_dict in input_dict_list:
-        passed, div = _validate_input(v=v, input_dict=each_input_dict)
-        div_list.append(div)
-        passed_list.append(passed)
+    """ Returns the passed (True or False) and error div of each row of 'input_df' validated against 'schema'.
+
+    Rows are checked by column first, only the rows that might not pass go through 'MyValidator'
+    for its error message.
+    """
+    passed_array = _validate_tb_columns(schema=schema, input_df=input_df)
+    if passed_array is None:
+        passed_array = np.zeros(len(input_df), dtype=bool)
+    passed_list = [True] * len(input_df)
+    div_list = [None] * len(input_df)
+    _failed_index = np.flatnonzero(~passed_array)
+    if len(_failed_index) != 0:
+        v = MyValidator(schema)
+        # v = Validator(schema)
+        for _index, each_input_dict in zip(_failed_index, input_df.iloc[_failed_index].to_dict('records')):
+            passed_list[_index], div_list[_index] = _validate_input(v=v, input_dict=each_input_dict)
     return passed_list, div_list
 
 
+def _validate_tb_columns(schema: dict, input_df: pd.DataFrame):
+    """ Returns the array of the rows of 'input_df' which pass 'schema', checked column by column.
+
+    A row failing here may still pass 'MyValidator', None is returned if 'schema' has a rule not checked here.
+    """
+    if set(input_df.columns) != set(schema.keys()):
+        return None
+    passed_array = np.ones(len(input_df), dtype=bool)
+    for each_field, each_rule_dict in schema.items():
+        _col = input_df[each_field]
+        _type_col = _col.map(type)
+        _type_array_dict = {'string': (_type_col == str).to_numpy(),
+                            'number': _type_col.isin([int, float]).to_numpy()}
+        _is_str = _type_array_dict['string']
+        _is_num = _type_array_dict['number']
+        _num_array = pd.to_numeric(_col.where(_is_num), errors='coerce').to_numpy(dtype=float)  # NaN if not number
+        with np.errstate(invalid='ignore'):
+            for each_rule, each_value in each_rule_dict.items():
+                if each_rule == 'required':
+                    continue
+                elif each_rule == 'type' and each_value in _type_array_dict:
+                    passed_array &= _type_array_dict[each_value]
+                elif each_rule == 'anyof_type' and all(each in _type_array_dict for each in each_value):
+                    passed_array &= np.any([_type_array_dict[each] for each in each_value], axis=0)
+                elif each_rule == 'anyof' and all(list(each.keys()) == ['type'] and each['type'] in _type_array_dict
+                                                  for each in each_value):
+                    # 'anyof_type' once the schema has been expanded by 'MyValidator'
+                    passed_array &= np.any([_type_array_dict[each['type']] for each in each_value], axis=0)
+                elif each_rule == 'empty':
+                    if not each_value:
+                        passed_array &= ~(_is_str & (_col == '').to_numpy())
+                elif each_rule == 'min':
+                    passed_array &= ~_is_num | (_num_array >= each_value)
+                elif each_rule == 'max':
+                    passed_array &= ~_is_num | (_num_array <= each_value)
+                elif each_rule == 'greater_than_zero':
+                    if each_value:
+                        passed_array &= _is_num & (_num_array > 0)
+                elif each_rule == 'between_zero_and_one':
+                    if each_value:
+                        passed_array &= _is_num & (_num_array >= 0) & (_num_array <= 1)
+                elif each_rule == 'empty_str':
+                    if each_value:
+                        passed_array &= ~_is_str | (_col == '').to_numpy()
+                elif each_rule in chem_name_rule_list:
+                    if each_value:
+                        _chem_passed_dict = {each: not is_number(each) and _parse_chem_name(each, each_rule)[2] is None
+                                             for each in set(_col[_is_str])}
+                        passed_array &= _is_str & _col.map(_chem_passed_dict).fillna(False).to_numpy(dtype=bool)
+                else:
+                    return None
+    return passed_array
+
+
 def _validate_input(v: Validator, input_dict: dict):
     passed = v.validate(input_dict)
     if passed:
@@ -508,7 +747,20 @@ def _validate_input(v: Validator, input_dict: dict):
     return passed, html.P('INPUT ERROR: {}'.format(error_message_str))
 
 
-def update_iso_table_callback(sample_tb_rows, prev_iso_tb_rows, database):
+def get_iso_update_key(sample_tb_rows, database):
+    """ Returns a hash of what the isotope table is formed from: the database and the layers of the sample table. """
+    layer_list = [each_row.get(chem_name) for each_row in sample_tb_rows or []]
+    return hashlib.sha1(json.dumps([database, layer_list], default=str).encode('utf-8')).hexdigest()
+
+
+def update_iso_table_callback(sample_tb_rows, prev_iso_tb_rows, database, prev_update_key=None):
+    """ Returns the rows of the isotope table and the key (see 'get_iso_update_key') they were formed from.
+
+    Nothing is updated when the key is 'prev_update_key', e.g. only thicknesses or densities were edited.
+    """
+    update_key = get_iso_update_key(sample_tb_rows=sample_tb_rows, database=database)
+    if update_key == prev_update_key:
+        raise PreventUpdate
     compos_tb_df = pd.DataFrame(sample_tb_rows)
     prev_iso_tb_df = pd.DataFrame(prev_iso_tb_rows)
     try:
@@ -516,21 +768,108 @@ def update_iso_table_callback(sample_tb_rows, prev_iso_tb_rows, database):
         new_iso_df = form_iso_table(sample_df=sample_df, database=database)
         new_iso_df = update_new_iso_table(prev_iso_df=prev_iso_tb_df, new_iso_df=new_iso_df)
         try:
-            return new_iso_df.to_dict('records')
+            new_iso_tb_rows = new_iso_df.to_dict('records')
         except AttributeError:
-            return iso_tb_df_default.to_dict('records')
+            return iso_tb_df_default.to_dict('records'), update_key
+        if new_iso_tb_rows == prev_iso_tb_rows:
+            return no_update, update_key  # e.g. a database with the same isotopes
+        return new_iso_tb_rows, update_key
     except KeyError:
-        return iso_tb_df_default.to_dict('records')
+        return iso_tb_df_default.to_dict('records'), update_key
+
+
+def init_reso(e_min, e_max, e_step, database, sample_tb_df, iso_tb_df=None, iso_changed=(), use_cache=True):
+    """ Returns a Resonance object with the sample stack added, reusing a cached build when possible.
+
+    The returned object is shared by all callbacks of this worker and must not be modified. With 'use_cache'
+    False a new build is not cached, for energy ranges used once (zoom windows, export chunks) not to evict
+    the builds that are reused.
+    """
+    key = _reso_cache_key(e_min=e_min, e_max=e_max, e_step=e_step, database=database,
+                          sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    with _reso_cache_lock:
+        if key in _reso_cache:
+            _reso_cache.move_to_end(key)
+            return _reso_cache[key][0]
+
+    o_reso = Resonance(energy_min=e_min, energy_max=e_max, energy_step=e_step, database=database)
+    o_reso = unpack_sample_tb_df_and_add_layer(o_reso=o_reso, sample_tb_df=sample_tb_df)
+    if iso_tb_df is not None:
+        o_reso = unpack_iso_tb_df_and_update(o_reso=o_reso, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    if use_cache:
+        _add_to_reso_cache(key=key, o_reso=o_reso)
+    return o_reso
+
 
+def _add_to_reso_cache(key, o_reso):
+    nbytes = _nbytes_of_nested(o_reso.stack_sigma) + _nbytes_of_nested(o_reso.stack_signal)
+    if nbytes > reso_cache_max_bytes:
+        return
+    with _reso_cache_lock:
+        _reso_cache[key] = (o_reso, nbytes)
+        _reso_cache.move_to_end(key)
+        # Evict the least recently used builds until both limits are met
+        while len(_reso_cache) > reso_cache_max_items or \
+                sum(_item[1] for _item in _reso_cache.values()) > reso_cache_max_bytes:
+            _reso_cache.popitem(last=False)
 
-def init_reso_from_tb(range_tb_df, e_step, database):
-    v_1 = range_tb_df[energy_name][0]
-    v_2 = range_tb_df[energy_name][1]
-    if v_1 < v_2:
-        o_reso = Resonance(energy_min=v_1, energy_max=v_2, energy_step=e_step, database=database)
+
+def _nbytes_of_nested(obj):
+    """ Returns the total size of the numpy arrays held in nested dicts. """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_nbytes_of_nested(_value) for _value in obj.values())
+    return 0
+
+
+def _canonical_value(value):
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _reso_cache_key(e_min, e_max, e_step, database, sample_tb_df, iso_tb_df, iso_changed):
+    """ Returns a hash of everything that defines a built Resonance object. """
+    num_layer = len(sample_tb_df[chem_name])
+    if thick_name in sample_tb_df.columns:
+        thick_list = sample_tb_df[thick_name].tolist()
     else:
-        o_reso = Resonance(energy_min=v_2, energy_max=v_1, energy_step=e_step, database=database)
-    return o_reso
+        thick_list = [1] * num_layer
+    if density_name in sample_tb_df.columns:
+        density_list = sample_tb_df[density_name].tolist()
+    else:
+        density_list = [''] * num_layer
+    layer_list = [[str(_formula), _canonical_value(_thick), _canonical_value(_density)]
+                  for _formula, _thick, _density in zip(sample_tb_df[chem_name].tolist(), thick_list, density_list)]
+
+    iso_list = []
+    if iso_tb_df is not None and len(iso_changed) != 0:
+        for _layer, _ele, _iso, _ratio in zip(iso_tb_df[layer_name], iso_tb_df[ele_name],
+                                              iso_tb_df[iso_name], iso_tb_df[iso_ratio_name]):
+            iso_list.append([str(_layer), str(_ele), str(_iso), _canonical_value(_ratio)])
+
+    key_list = [database, _canonical_value(e_min), _canonical_value(e_max), _canonical_value(e_step),
+                layer_list, iso_list]
+    return hashlib.sha1(json.dumps(key_list).encode('utf-8')).hexdigest()
+
+
+def get_beam_shape(beamline):
+    """ Returns the beam shape df of a beamline and the cubic interpolation of its flux vs energy.
+
+    Files are parsed once per worker and parsed again only when modified on disk.
+    """
+    _path = os.path.join(_main_path, beam_shape_path_dict[beamline])
+    _mtime = os.path.getmtime(_path)
+    if beamline not in _beam_shape_registry or _beam_shape_registry[beamline]['mtime'] != _mtime:
+        df = load_beam_shape(_path)
+        _beam_shape_registry[beamline] = {
+            'mtime': _mtime,
+            'df': df,
+            'flux_function': interp1d(x=df['energy_eV'], y=df['flux'], kind='cubic'),
+        }
+    return _beam_shape_registry[beamline]['df'], _beam_shape_registry[beamline]['flux_function']
 
 
 def load_beam_shape(relative_path_to_beam_shape):
@@ -548,6 +887,95 @@ def load_beam_shape(relative_path_to_beam_shape):
     return df
 
 
+def build_xs_store(database_list=None, store_path=None):
+    """ Packs the energy and sigma arrays of every isotope file into one binary file with an offset index.
+
+    Downloads the databases which are not there yet. Run it once when deploying, e.g.
+    python -c "import _utilities; _utilities.build_xs_store()"
+    """
+    if database_list is None:
+        database_list = xs_store_database_list
+    if store_path is None:
+        store_path = xs_store_path
+    index_dict = {}
+    offset = 0
+    _store_dir = os.path.dirname(os.path.abspath(store_path))
+    _prefix = os.path.basename(store_path)
+    _bin_fd, _tmp_bin_path = tempfile.mkstemp(prefix=_prefix, suffix='.bin.tmp', dir=_store_dir)
+    _index_fd, _tmp_index_path = tempfile.mkstemp(prefix=_prefix, suffix='.json.tmp', dir=_store_dir)
+    try:
+        with os.fdopen(_bin_fd, 'wb') as f:
+            for each_database in database_list:
+                if each_database != 'Bonded_H':
+                    ir_util.get_list_element_from_database(database=each_database)  # download if not there yet
+                _file_list = sorted(glob.glob(os.path.join(ir_ref_data_path, each_database, '*.csv')))
+                for each_file in _file_list:
+                    _file_name = os.path.basename(each_file)
+                    if _file_name.startswith('_'):  # '_elements_list.csv'
+                        continue
+                    _df = pd.read_csv(each_file, header=0)
+                    _energy = np.ascontiguousarray(_df['E_eV'], dtype='<f8')
+                    _sigma = np.ascontiguousarray(_df['Sig_b'], dtype='<f8')
+                    f.write(_energy.tobytes())
+                    f.write(_sigma.tobytes())
+                    index_dict[each_database + '/' + _file_name] = [offset, len(_energy)]
+                    offset += 2 * len(_energy)
+        with os.fdopen(_index_fd, 'w') as f:
+            json.dump(index_dict, f)
+        for each_path in [_tmp_bin_path, _tmp_index_path]:
+            os.chmod(each_path, 0o644)  # 'mkstemp' files are only readable by their owner
+        # Replace atomically so workers never map a half written store
+        os.replace(_tmp_bin_path, store_path + '.bin')
+        os.replace(_tmp_index_path, store_path + '.json')
+    except BaseException:
+        for each_path in [_tmp_bin_path, _tmp_index_path]:
+            if os.path.exists(each_path):
+                os.remove(each_path)
+        raise
+    _xs_store.clear()
+    return index_dict
+
+
+def load_xs_store(store_path=None):
+    """ Returns the memory-mapped cross-section store and its index, or (None, None) if not built. """
+    if store_path is None:
+        store_path = xs_store_path
+    if store_path not in _xs_store:
+        if not (os.path.exists(store_path + '.bin') and os.path.exists(store_path + '.json')):
+            return None, None
+        with open(store_path + '.json', 'r') as f:
+            index_dict = json.load(f)
+        _xs_store[store_path] = (np.memmap(store_path + '.bin', dtype='<f8', mode='r'), index_dict)
+    return _xs_store[store_path]
+
+
+def get_database_data_from_store(file_name=''):
+    """ Drop-in for 'ImagingReso._utilities.get_database_data' reading from the packed store. """
+    xs_array, index_dict = load_xs_store()
+    if xs_array is not None:
+        _key = os.path.relpath(os.path.abspath(file_name), ir_ref_data_path).replace(os.sep, '/')
+        if _key in index_dict:
+            offset, length = index_dict[_key]
+            # Zero-copy slices of the shared mapping
+            return {'E_eV': xs_array[offset:offset + length],
+                    'Sig_b': xs_array[offset + length:offset + 2 * length]}
+    return _ir_get_database_data(file_name=file_name)
+
+
+def use_xs_store(build_if_missing=False):
+    """ Routes the cross-section reads of ImagingReso through the packed store, if it has been built. """
+    xs_array, index_dict = load_xs_store()
+    if xs_array is None and build_if_missing:
+        try:
+            build_xs_store()
+        except Exception as error_message:
+            warnings.warn("Packed cross-section store not built, '.csv' files will be used: {}".format(error_message))
+        xs_array, index_dict = load_xs_store()
+    if xs_array is not None:
+        ir_util.get_database_data = get_database_data_from_store
+    return xs_array is not None
+
+
 def unpack_sample_tb_df_and_add_layer(o_reso, sample_tb_df):
     num_layer = len(sample_tb_df[chem_name])
     for layer_index in range(num_layer):
@@ -596,15 +1024,10 @@ def unpack_iso_tb_df_and_update(o_reso, iso_tb_df, iso_changed):
         return o_reso
 
 
-def calculate_transmission(sample_tb_df, iso_tb_df, iso_changed, beamline, band_min, band_max, band_type, database):
-    _main_path = os.path.abspath(os.path.dirname(__file__))
-    _path_to_beam_shape = {'imaging': 'static/instrument_file/beam_flux_cg1d.txt',
-                           'imaging_crop': 'static/instrument_file/beam_flux_cg1d_crop.txt',
-                           'snap': 'static/instrument_file/beam_flux_snap.txt',
-                           # 'venus': 'static/instrument_file/beam_flux_venus.txt',
-                           }
-    df_flux_raw = load_beam_shape(_path_to_beam_shape[beamline])
+def get_beam_energy_range(beamline, band_min, band_max, band_type):
+    """ Returns the energy range (eV) of the beam spectrum, or of the band width for the SNS beamlines. """
     if beamline in ['imaging', 'imaging_crop']:
+        df_flux_raw = get_beam_shape(beamline=beamline)[0]
         e_min = df_flux_raw['energy_eV'].min()
         e_max = df_flux_raw['energy_eV'].max()
     else:
@@ -614,54 +1037,324 @@ def calculate_transmission(sample_tb_df, iso_tb_df, iso_changed, beamline, band_
         else:  # band_type == 'energy'
             e_min = band_min
             e_max = band_max
-
-    e_step = (e_max - e_min) / (100 - 1)
-    __o_reso = Resonance(energy_min=e_min, energy_max=e_max, energy_step=e_step, database=database)
-    _o_reso = unpack_sample_tb_df_and_add_layer(o_reso=__o_reso, sample_tb_df=sample_tb_df)
-    o_reso = unpack_iso_tb_df_and_update(o_reso=_o_reso, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
-    o_stack = o_reso.stack
+        # The band width is limited to the spectrum
+        df_flux_raw = get_beam_shape(beamline=beamline)[0]
+        e_min = max(e_min, df_flux_raw['energy_eV'].min())
+        e_max = min(e_max, df_flux_raw['energy_eV'].max())
+        if e_min >= e_max:
+            raise ValueError("The band width is out of the spectrum ({}, {}) eV.".format(
+                df_flux_raw['energy_eV'].min(), df_flux_raw['energy_eV'].max()))
+    return e_min, e_max
+
+
+def calculate_transmission(sample_tb_df, iso_tb_df, iso_changed, beamline, band_min, band_max, band_type, database,
+                           integration='trapz', nbr_point=linear_nbr_point):
+    """ Returns the flux weighted total transmission (%) and the stack with the transmission of layers and elements.
+
+    'integration' is one of 'integration_method_list'; 'trapz' uses the linear grid of ImagingReso, the others
+    evaluate the raw cross-sections on their own quadrature nodes.
+    """
+    if integration != 'trapz':
+        return _calculate_transmission_quadrature(sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df,
+                                                  iso_changed=iso_changed, beamline=beamline, band_min=band_min,
+                                                  band_max=band_max, band_type=band_type, database=database,
+                                                  integration=integration, nbr_point=nbr_point)
+    df_flux_raw, interp_flux_function = get_beam_shape(beamline=beamline)
+    e_min, e_max = get_beam_energy_range(beamline=beamline, band_min=band_min, band_max=band_max,
+                                         band_type=band_type)
+
+    e_step = (e_max - e_min) / (nbr_point - 1)
+    o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=e_step, database=database,
+                       sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    o_stack = copy.deepcopy(o_reso.stack)  # the cached object is shared, results are added to a copy
 
     # interpolate with the beam shape energy
     energy = o_reso.total_signal['energy_eV'].round(6)  # !!!need to fix ImagingReso energy_eV columns
-    interp_type = 'cubic'
-    interp_flux_function = interp1d(x=df_flux_raw['energy_eV'], y=df_flux_raw['flux'], kind=interp_type)
     flux_interp = interp_flux_function(energy)
     df_flux_interp = pd.DataFrame()
     df_flux_interp['energy_eV'] = energy
     df_flux_interp['flux'] = flux_interp
     df_flux = df_flux_interp[:]
     trans_tag = 'transmission'
-    mu_tag = 'mu_per_cm'
     o_signal = o_reso.stack_signal
 
-    _total_trans = _calculate_transmission(flux_df=df_flux, trans_array=o_reso.total_signal[trans_tag])
-
+    # Stack the total, layer and element transmissions to integrate all of them in one pass
+    path_list = [()]
+    trans_list = [o_reso.total_signal[trans_tag]]
     for each_layer in o_stack.keys():
-        _current_layer_thickness = o_stack[each_layer]['thickness']['value']
-        if len(o_stack.keys()) == 1:
-            _current_layer_trans = _total_trans
-        else:
-            _current_layer_trans = _calculate_transmission(flux_df=df_flux,
-                                                           trans_array=o_signal[each_layer][trans_tag])
-        o_stack[each_layer][trans_tag] = _current_layer_trans
-        o_stack[each_layer][mu_tag] = _transmission_to_mu_per_cm(transmission=_current_layer_trans,
-                                                                 thickness=_current_layer_thickness)
+        path_list.append((each_layer,))
+        trans_list.append(o_signal[each_layer][trans_tag])
         for each_ele in o_stack[each_layer]['elements']:
-            _current_ele_trans = _calculate_transmission(flux_df=df_flux,
-                                                         trans_array=o_signal[each_layer][each_ele][trans_tag])
-            o_stack[each_layer][each_ele][trans_tag] = _current_ele_trans
-            o_stack[each_layer][each_ele][mu_tag] = _transmission_to_mu_per_cm(transmission=_current_ele_trans,
-                                                                               thickness=_current_layer_thickness)
+            path_list.append((each_layer, each_ele))
+            trans_list.append(o_signal[each_layer][each_ele][trans_tag])
+    trans_result = _calculate_transmission_batch(flux_df=df_flux, trans_matrix=np.vstack(trans_list))
+
+    _total_trans = _fill_stack_transmission(o_stack=o_stack, path_list=path_list, trans_result=trans_result)
     return _total_trans, o_stack
 
 
-def _calculate_transmission(flux_df: pd.DataFrame, trans_array: np.array):
-    # calculated transmitted flux
-    trans_flux = trans_array * flux_df['flux']
-    integr_total = np.trapz(y=flux_df['flux'] / flux_df['energy_eV'], x=flux_df['energy_eV'], dx=1e-6).round(3)
-    integr_trans = np.trapz(y=trans_flux / flux_df['energy_eV'], x=flux_df['energy_eV'], dx=1e-6).round(3)
-    _trans = integr_trans / integr_total * 100
-    return _trans
+def _calculate_transmission_quadrature(sample_tb_df, iso_tb_df, iso_changed, beamline, band_min, band_max,
+                                       band_type, database, integration, nbr_point):
+    e_min, e_max = get_beam_energy_range(beamline=beamline, band_min=band_min, band_max=band_max,
+                                         band_type=band_type)
+    # Only the stack is needed from ImagingReso, cross-sections are read raw
+    o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=e_max - e_min, database=database,
+                       sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    return calculate_stack_transmission(o_stack=o_reso.stack, database=database, beamline=beamline,
+                                        band_min=band_min, band_max=band_max, band_type=band_type,
+                                        integration=integration, nbr_point=nbr_point)
+
+
+def calculate_stack_transmission(o_stack, database, beamline, band_min, band_max, band_type,
+                                 integration=quadrature_integration, nbr_point=quadrature_nbr_point):
+    """ Returns the flux weighted total transmission (%) of an already built stack and a copy of the stack
+    with the transmission of layers and elements, integrated with the quadrature 'integration'.
+    """
+    interp_flux_function = get_beam_shape(beamline=beamline)[1]
+    e_min, e_max = get_beam_energy_range(beamline=beamline, band_min=band_min, band_max=band_max,
+                                         band_type=band_type)
+    o_stack = copy.deepcopy(o_stack)
+    raw_sigma_dict = get_raw_sigma_of_stack(o_stack=o_stack, database=database)
+    _check_raw_sigma_range(raw_sigma_dict=raw_sigma_dict, e_min=e_min, e_max=e_max)
+
+    energy, weights = get_quadrature(method=integration, e_min=e_min, e_max=e_max, nbr_point=nbr_point)
+    path_list, trans_matrix = _stack_transmission_at(o_stack=o_stack, raw_sigma_dict=raw_sigma_dict, energy=energy)
+    flux_per_e = interp_flux_function(energy) / energy
+    trans_result = (trans_matrix * flux_per_e) @ weights / (flux_per_e @ weights) * 100
+    _total_trans = _fill_stack_transmission(o_stack=o_stack, path_list=path_list, trans_result=trans_result)
+    return _total_trans, o_stack
+
+
+def get_transmission_grid(beamline):
+    """ Returns the energy grid the transmission at 'beamline' is shown on (see 'form_transmission_result_div'). """
+    return 'adaptive' if beamline in adaptive_beamline_list else 'quadrature'
+
+
+def calculate_stack_transmission_on_grid(o_stack, database, beamline, band_min, band_max, band_type, grid):
+    """ Returns the total transmission (%) and the stack as 'form_transmission_result_div' shows them on 'grid',
+    'adaptive' or 'quadrature'.
+    """
+    if grid == 'adaptive':
+        return calculate_stack_transmission_adaptive(o_stack=o_stack, database=database, beamline=beamline,
+                                                     band_min=band_min, band_max=band_max, band_type=band_type)[:2]
+    return calculate_stack_transmission(o_stack=o_stack, database=database, beamline=beamline, band_min=band_min,
+                                        band_max=band_max, band_type=band_type)
+
+
+def calculate_transmission_all(sample_tb_df, iso_tb_df, iso_changed, band_min, band_max, band_type, database,
+                               beamline_list=None):
+    """ Returns {beamline: (total_trans, o_stack)} of every registered beam spectrum, computed concurrently.
+
+    Each spectrum is integrated on the grid of its own result ('get_transmission_grid'), so both show the same
+    numbers. The sample stack is built once and sent to the workers of the pool. A spectrum that can not be
+    computed (e.g. not covered by the cross-sections) gets the error message instead of the result.
+    """
+    if beamline_list is None:
+        beamline_list = list(beam_shape_path_dict.keys())
+    o_reso = init_reso(e_min=1, e_max=2, e_step=1, database=database,
+                       sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    _kwargs_dict = {each_beamline: dict(o_stack=o_reso.stack, database=database, beamline=each_beamline,
+                                        band_min=band_min, band_max=band_max, band_type=band_type,
+                                        grid=get_transmission_grid(beamline=each_beamline))
+                    for each_beamline in beamline_list}
+    try:
+        _pool = get_transmission_pool()
+        _future_dict = {each_beamline: _pool.submit(calculate_stack_transmission_on_grid,
+                                                    **_kwargs_dict[each_beamline])
+                        for each_beamline in beamline_list}
+    except (BrokenProcessPool, OSError, RuntimeError):
+        shutdown_transmission_pool()
+        _future_dict = {}
+    result_dict = {}
+    for each_beamline in beamline_list:
+        try:
+            try:
+                if each_beamline not in _future_dict:
+                    raise BrokenProcessPool
+                result_dict[each_beamline] = _future_dict[each_beamline].result()
+            except BrokenProcessPool:
+                # Computed here if the pool is not available
+                shutdown_transmission_pool()
+                _future_dict = {}
+                result_dict[each_beamline] = calculate_stack_transmission_on_grid(**_kwargs_dict[each_beamline])
+        except Exception as error_message:
+            result_dict[each_beamline] = str(error_message)
+    return result_dict
+
+
+def get_transmission_pool():
+    """ Returns the process pool of this worker, started on first use. """
+    global _transmission_pool
+    if _transmission_pool is None:
+        _transmission_pool = ProcessPoolExecutor(max_workers=transmission_pool_workers)
+    return _transmission_pool
+
+
+def shutdown_transmission_pool():
+    global _transmission_pool
+    if _transmission_pool is not None:
+        _transmission_pool.shutdown(wait=False)
+        _transmission_pool = None
+
+
+def init_thickness_sweep(sample_tb_df, iso_tb_df, iso_changed, beamline, band_min, band_max, band_type, database,
+                         grid='quadrature', integration=quadrature_integration, nbr_point=None):
+    """ Returns what the transmission vs the thickness of each layer needs (see 'get_layer_sweep').
+
+    The energy grid is the one of the transmission it is shown with: 'linear' the grid of 'calculate_transmission'
+    with 'nbr_point' (default 'linear_nbr_point') energies, 'adaptive' the grid of 'calculate_transmission_adaptive'
+    at the thicknesses of the sample and 'quadrature' the nodes of 'integration' as in
+    'calculate_stack_transmission'.
+    The attenuation coefficients of all layers are computed once, from the raw cross-sections.
+    """
+    interp_flux_function = get_beam_shape(beamline=beamline)[1]
+    e_min, e_max = get_beam_energy_range(beamline=beamline, band_min=band_min, band_max=band_max,
+                                         band_type=band_type)
+    if grid == 'linear':
+        if nbr_point is None:
+            nbr_point = linear_nbr_point
+        o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=(e_max - e_min) / (nbr_point - 1), database=database,
+                           sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+        energy = np.asarray(o_reso.total_signal['energy_eV'], dtype=float)
+        flux_energy = energy.round(6)  # as in 'calculate_transmission'
+        weights = _trapz_weights(flux_energy)
+    else:
+        o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=e_max - e_min, database=database,
+                           sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    o_stack = o_reso.stack
+    raw_sigma_dict = get_raw_sigma_of_stack(o_stack=o_stack, database=database)
+    if grid == 'adaptive':
+        energy = _adaptive_energy_grid(o_stack=o_stack, raw_sigma_dict=raw_sigma_dict,
+                                       interp_flux_function=interp_flux_function, e_min=e_min, e_max=e_max,
+                                       tol=adaptive_tol_default, max_points=adaptive_max_points_default)[0]
+        flux_energy = energy
+        weights = _trapz_weights(energy)
+    elif grid != 'linear':
+        if nbr_point is None:
+            nbr_point = quadrature_nbr_point
+        _check_raw_sigma_range(raw_sigma_dict=raw_sigma_dict, e_min=e_min, e_max=e_max)
+        energy, weights = get_quadrature(method=integration, e_min=e_min, e_max=e_max, nbr_point=nbr_point)
+        flux_energy = energy
+
+    flux_weights = interp_flux_function(flux_energy) / flux_energy * weights
+    flux_weights = flux_weights / flux_weights.sum()
+    mu_per_cm_dict = {each_layer: sum(_element_mu_per_cm_at(o_stack=o_stack, raw_sigma_dict=raw_sigma_dict,
+                                                            layer=each_layer, element=each_ele, energy=energy)
+                                      for each_ele in o_stack[each_layer]['elements'])
+                      for each_layer in o_stack.keys()}
+    return {'mu_per_cm': mu_per_cm_dict,
+            'flux_weights': flux_weights,
+            'thickness': {each_layer: o_stack[each_layer]['thickness']['value'] for each_layer in o_stack.keys()},
+            'thickness_cm': {each_layer: _layer_thickness_cm(o_stack=o_stack, layer=each_layer)
+                             for each_layer in o_stack.keys()}}
+
+
+def get_layer_sweep(stack_sweep_dict, layer):
+    """ Returns what the transmission vs the thickness of 'layer' needs, the other layers keeping their thickness.
+
+    'mu_per_cm' is the attenuation coefficient of the layer on the energy grid and 'weights' the normalized
+    flux weights times the transmission of the other layers.
+    """
+    if layer not in stack_sweep_dict['mu_per_cm']:
+        raise ValueError("'{}' is not a layer of the sample.".format(layer))
+    mu_others = sum(stack_sweep_dict['mu_per_cm'][each_layer] * stack_sweep_dict['thickness_cm'][each_layer]
+                    for each_layer in stack_sweep_dict['mu_per_cm'].keys() if each_layer != layer)
+    return {'layer': layer,
+            'mu_per_cm': stack_sweep_dict['mu_per_cm'][layer],
+            'weights': stack_sweep_dict['flux_weights'] * np.exp(-mu_others),
+            'thickness': stack_sweep_dict['thickness'][layer]}
+
+
+def sweep_thickness(sweep_dict, thickness_list):
+    """ Returns the total transmission (%) for every thickness (mm) of the swept layer. """
+    thickness_cm = np.asarray(thickness_list, dtype=float)[:, None] / 10
+    return np.exp(-thickness_cm * sweep_dict['mu_per_cm']) @ sweep_dict['weights'] * 100
+
+
+def solve_thickness(sweep_dict, target_trans, thickness_max=thickness_solve_max):
+    """ Returns the thickness (mm) of the swept layer that gives the total transmission 'target_trans' (%). """
+    trans_without_layer = sweep_thickness(sweep_dict=sweep_dict, thickness_list=[0])[0]
+    if target_trans >= trans_without_layer:
+        raise ValueError("The other layers transmit {} % only.".format(round(trans_without_layer, 3)))
+    # Bracket the root on a log grid, the transmission decreases with the thickness
+    thickness_grid = np.concatenate([[0], np.geomspace(1e-6, thickness_max, 100)])
+    trans_grid = sweep_thickness(sweep_dict=sweep_dict, thickness_list=thickness_grid)
+    _below = np.flatnonzero(trans_grid <= target_trans)
+    if len(_below) == 0:
+        raise ValueError("More than {} mm is needed.".format(thickness_max))
+    return brentq(lambda _t: sweep_thickness(sweep_dict=sweep_dict, thickness_list=[_t])[0] - target_trans,
+                  thickness_grid[_below[0] - 1], thickness_grid[_below[0]], xtol=1e-12, rtol=1e-10)
+
+
+def _fill_stack_transmission(o_stack, path_list, trans_result):
+    """ Adds the transmission (%) and attenuation coefficient of every layer and element to the stack.
+
+    Returns the total transmission, the first of 'trans_result'.
+    """
+    trans_tag = 'transmission'
+    mu_tag = 'mu_per_cm'
+    for _path, _trans in zip(path_list[1:], trans_result[1:]):
+        _current_layer_thickness = o_stack[_path[0]]['thickness']['value']
+        _current_dict = o_stack[_path[0]] if len(_path) == 1 else o_stack[_path[0]][_path[1]]
+        _current_dict[trans_tag] = _trans
+        _current_dict[mu_tag] = _transmission_to_mu_per_cm(transmission=_trans, thickness=_current_layer_thickness)
+    return trans_result[0]
+
+
+@functools.lru_cache(maxsize=64)
+def get_quadrature(method, e_min, e_max, nbr_point):
+    """ Returns the energy nodes and weights such that sum(weights * f(nodes)) approximates the integral of f.
+
+    'trapz' is linear in energy, 'log_trapz', 'simpson' and 'gauss' work in ln(energy) so that every decade of a
+    wide band gets the same number of nodes. 'simpson' uses an odd number of nodes and 'gauss' composite
+    Gauss-Legendre panels of 'gauss_order' nodes. Nodes are cached per range and must not be modified.
+    """
+    if method not in integration_method_list:
+        raise ValueError("'method' must be one of {}".format(integration_method_list))
+    if method == 'trapz':
+        energy = np.linspace(e_min, e_max, nbr_point)
+        weights = _trapz_weights(energy)
+    elif method == 'gauss':
+        nbr_panel = max(int(round(nbr_point / gauss_order)), 1)
+        u_edges = np.linspace(np.log(e_min), np.log(e_max), nbr_panel + 1)
+        _x, _w = np.polynomial.legendre.leggauss(gauss_order)
+        _half = np.diff(u_edges)[:, None] / 2
+        u = ((u_edges[:-1, None] + u_edges[1:, None]) / 2 + _half * _x).ravel()
+        energy = np.exp(u)
+        weights = (_half * _w).ravel() * energy
+    else:
+        if method == 'simpson' and nbr_point % 2 == 0:
+            nbr_point += 1
+        u = np.linspace(np.log(e_min), np.log(e_max), nbr_point)
+        energy = np.exp(u)
+        energy[0], energy[-1] = e_min, e_max
+        if method == 'simpson':
+            _w = np.ones(nbr_point)
+            _w[1:-1:2] = 4
+            _w[2:-1:2] = 2
+            weights = _w * (u[1] - u[0]) / 3 * energy
+        else:  # method == 'log_trapz'
+            weights = _trapz_weights(u) * energy
+    energy.flags.writeable = False
+    weights.flags.writeable = False
+    return energy, weights
+
+
+def _trapz_weights(x):
+    weights = np.zeros(len(x))
+    weights[:-1] += np.diff(x) / 2
+    weights[1:] += np.diff(x) / 2
+    return weights
+
+
+def _calculate_transmission_batch(flux_df: pd.DataFrame, trans_matrix: np.ndarray):
+    """ Returns the flux weighted transmission (%) of every row of 'trans_matrix'. """
+    energy = np.asarray(flux_df['energy_eV'], dtype=float)
+    flux_per_e = np.asarray(flux_df['flux'], dtype=float) / energy
+    # The denominator is shared by all rows
+    integr_total = np.trapz(y=flux_per_e, x=energy).round(3)
+    integr_trans = np.trapz(y=trans_matrix * flux_per_e, x=energy, axis=1).round(3)
+    return integr_trans / integr_total * 100
 
 
 def _transmission_to_mu_per_cm(transmission, thickness):
@@ -669,37 +1362,271 @@ def _transmission_to_mu_per_cm(transmission, thickness):
     return mu_per_cm
 
 
-def form_transmission_result_div(sample_tb_rows, iso_tb_rows, iso_changed, database,
-                                 beamline, band_min, band_max, band_type):
-    disclaimer = markdown_disclaimer_sns
-    if beamline == 'snap':
-        beamline_name = 'SNAP (BL-3), SNS'
-    elif beamline == 'venus':
-        beamline_name = 'VENUS (BL-10), SNS'
-    elif beamline == 'imaging_crop':
-        beamline_name = u'IMAGING (CG-1D) \u2264 5.35 \u212B, HFIR'
-        disclaimer = markdown_disclaimer_hfir
-    else:  # beamline == 'imaging':
-        beamline_name = 'IMAGING (CG-1D), HFIR'
+def calculate_transmission_adaptive(sample_tb_df, iso_tb_df, iso_changed, beamline, band_min, band_max, band_type,
+                                    database, tol=adaptive_tol_default, max_points=adaptive_max_points_default):
+    """ Same as 'calculate_transmission' but integrated on an adaptive energy grid.
+
+    The grid is seeded with the resonance peaks of the raw cross-sections in range and intervals are bisected
+    until the estimated error of the total transmission (%) is below 'tol' or 'max_points' energies are used.
+    Returns the total transmission, the stack and the achieved error estimate (%).
+    """
+    e_min, e_max = get_beam_energy_range(beamline=beamline, band_min=band_min, band_max=band_max,
+                                         band_type=band_type)
+    # Only the stack is needed from ImagingReso, cross-sections are read raw
+    o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=e_max - e_min, database=database,
+                       sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
+    return calculate_stack_transmission_adaptive(o_stack=o_reso.stack, database=database, beamline=beamline,
+                                                 band_min=band_min, band_max=band_max, band_type=band_type, tol=tol,
+                                                 max_points=max_points)
+
+
+def calculate_stack_transmission_adaptive(o_stack, database, beamline, band_min, band_max, band_type,
+                                          tol=adaptive_tol_default, max_points=adaptive_max_points_default):
+    """ Same as 'calculate_transmission_adaptive' for an already built stack, which is copied. """
+    interp_flux_function = get_beam_shape(beamline=beamline)[1]
+    e_min, e_max = get_beam_energy_range(beamline=beamline, band_min=band_min, band_max=band_max,
+                                         band_type=band_type)
+    o_stack = copy.deepcopy(o_stack)
+    raw_sigma_dict = get_raw_sigma_of_stack(o_stack=o_stack, database=database)
+    energy, path_list, y, achieved_error = _adaptive_energy_grid(o_stack=o_stack, raw_sigma_dict=raw_sigma_dict,
+                                                                 interp_flux_function=interp_flux_function,
+                                                                 e_min=e_min, e_max=e_max, tol=tol,
+                                                                 max_points=max_points)
+    df_flux = pd.DataFrame({'energy_eV': energy, 'flux': y[0] * energy})
+    trans_result = _calculate_transmission_batch(flux_df=df_flux, trans_matrix=y[1:])
+
+    _total_trans = _fill_stack_transmission(o_stack=o_stack, path_list=path_list, trans_result=trans_result)
+    return _total_trans, o_stack, achieved_error
+
+
+def _adaptive_energy_grid(o_stack, raw_sigma_dict, interp_flux_function, e_min, e_max, tol, max_points):
+    """ Returns the sorted energies of the adaptive grid (see 'calculate_transmission_adaptive'), the paths of
+    the stack, the values at these energies (row 0 flux/E, then the transmission of every path) and the
+    achieved error estimate (%).
+    """
+    def _evaluate(energy):
+        path_list, trans_matrix = _stack_transmission_at(o_stack=o_stack, raw_sigma_dict=raw_sigma_dict,
+                                                         energy=energy)
+        return path_list, np.vstack([interp_flux_function(energy) / energy, trans_matrix])
+
+    seed = np.linspace(e_min, e_max, adaptive_seed_points)
+    peaks = _resonance_peaks(raw_sigma_dict=raw_sigma_dict, e_min=e_min, e_max=e_max,
+                             max_peaks=max(max_points // 4 - len(seed), 0))
+    seed = np.unique(np.concatenate([seed, peaks]))
+    path_list, y_seed = _evaluate(seed)
+
+    # Every interval keeps its ends and its midpoint, errors compare trapezoid on 2 and 3 points
+    a, b = seed[:-1], seed[1:]
+    y_a, y_b = y_seed[:, :-1], y_seed[:, 1:]
+    m = (a + b) / 2
+    y_m = _evaluate(m)[1]
+    nbr_point = len(seed) + len(m)
+    while True:
+        err = _interval_error(a=a, b=b, y_a=y_a, y_m=y_m, y_b=y_b)
+        achieved_error = err.sum()
+        if achieved_error <= tol or nbr_point >= max_points:
+            break
+        # Split the intervals above their share of the tolerance, worst first, within the point budget
+        _split = np.flatnonzero(err > tol / len(err))
+        _split = _split[np.argsort(err[_split])[::-1]][:max((max_points - nbr_point) // 2, 1)]
+        _keep = np.setdiff1d(np.arange(len(a)), _split)
+        new_a = np.concatenate([a[_keep], a[_split], m[_split]])
+        new_b = np.concatenate([b[_keep], m[_split], b[_split]])
+        new_y_a = np.hstack([y_a[:, _keep], y_a[:, _split], y_m[:, _split]])
+        new_y_b = np.hstack([y_b[:, _keep], y_m[:, _split], y_b[:, _split]])
+        new_m = (new_a[len(_keep):] + new_b[len(_keep):]) / 2
+        new_y_m = np.hstack([y_m[:, _keep], _evaluate(new_m)[1]])
+        nbr_point += len(new_m)
+        a, b, y_a, y_b = new_a, new_b, new_y_a, new_y_b
+        m = np.concatenate([m[_keep], new_m])
+        y_m = new_y_m
+
+    # Every evaluated energy is kept
+    _last = np.argmax(b)
+    energy = np.concatenate([a, m, b[_last:_last + 1]])
+    y = np.hstack([y_a, y_m, y_b[:, _last:_last + 1]])
+    _order = np.argsort(energy)
+    energy, y = energy[_order], y[:, _order]
+    return energy, path_list, y, achieved_error
+
+
+def _interval_error(a, b, y_a, y_m, y_b):
+    """ Returns the error estimate (%) of the flux weighted total transmission contributed by each interval.
+
+    Row 0 of the values is flux/E and row 1 the total transmission.
+    """
+    _width = b - a
+    _g_a, _g_m, _g_b = y_a[0], y_m[0], y_b[0]
+    _n_a, _n_m, _n_b = y_a[0] * y_a[1], y_m[0] * y_m[1], y_b[0] * y_b[1]
+    err_total = np.abs(_width * (_g_a + _g_b) / 2 - _width * (_g_a + 2 * _g_m + _g_b) / 4)
+    err_trans = np.abs(_width * (_n_a + _n_b) / 2 - _width * (_n_a + 2 * _n_m + _n_b) / 4)
+    integr_total = (_width * (_g_a + 2 * _g_m + _g_b) / 4).sum()
+    return (err_total + err_trans) / integr_total * 100
+
+
+def _stack_transmission_at(o_stack, raw_sigma_dict, energy):
+    """ Returns the paths (total, layers, elements) and their transmissions at the given energies. """
+    path_list = [()]
+    trans_list = [np.ones_like(energy)]
+    for each_layer in o_stack.keys():
+        _thickness_cm = _layer_thickness_cm(o_stack=o_stack, layer=each_layer)
+        _layer_trans = np.ones_like(energy)
+        _ele_list = []
+        for each_ele in o_stack[each_layer]['elements']:
+            _ele_trans = np.exp(-_thickness_cm * _element_mu_per_cm_at(o_stack=o_stack, raw_sigma_dict=raw_sigma_dict,
+                                                                       layer=each_layer, element=each_ele,
+                                                                       energy=energy))
+            _layer_trans *= _ele_trans
+            _ele_list.append(((each_layer, each_ele), _ele_trans))
+        trans_list[0] = trans_list[0] * _layer_trans
+        path_list.append((each_layer,))
+        trans_list.append(_layer_trans)
+        for _path, _ele_trans in _ele_list:
+            path_list.append(_path)
+            trans_list.append(_ele_trans)
+    return path_list, np.vstack(trans_list)
+
+
+def _element_mu_per_cm_at(o_stack, raw_sigma_dict, layer, element, energy):
+    _sigma_ele = np.zeros_like(energy)
+    for _ratio, _e_raw, _sigma_raw in raw_sigma_dict[layer][element]:
+        _sigma_ele += _ratio * np.interp(energy, _e_raw, _sigma_raw)
+    return 1e-24 * _sigma_ele * o_stack[layer][element]['atoms_per_cm3']
+
+
+def _layer_thickness_cm(o_stack, layer):
+    return ir_util.set_distance_units(value=o_stack[layer]['thickness']['value'],
+                                      from_units=o_stack[layer]['thickness']['units'],
+                                      to_units='cm')
+
+
+def _resonance_peaks(raw_sigma_dict, e_min, e_max, max_peaks):
+    """ Returns the energies of the highest local maxima of the raw cross-sections within [e_min, e_max]. """
+    peak_list = []
+    height_list = []
+    for each_layer in raw_sigma_dict.keys():
+        for each_ele in raw_sigma_dict[each_layer].keys():
+            for _ratio, _e_raw, _sigma_raw in raw_sigma_dict[each_layer][each_ele]:
+                _index = np.flatnonzero((_sigma_raw[1:-1] > _sigma_raw[:-2]) &
+                                        (_sigma_raw[1:-1] >= _sigma_raw[2:])) + 1
+                _index = _index[(_e_raw[_index] > e_min) & (_e_raw[_index] < e_max)]
+                peak_list.append(_e_raw[_index])
+                height_list.append(_ratio * _sigma_raw[_index])
+    if len(peak_list) == 0:
+        return np.array([])
+    peaks = np.concatenate(peak_list)
+    heights = np.concatenate(height_list)
+    return peaks[np.argsort(heights)[::-1][:max_peaks]]
+
+
+def _check_raw_sigma_range(raw_sigma_dict, e_min, e_max):
+    for each_layer in raw_sigma_dict.keys():
+        for each_ele in raw_sigma_dict[each_layer].keys():
+            for _ratio, _e_raw, _sigma_raw in raw_sigma_dict[each_layer][each_ele]:
+                if e_min < _e_raw[0] or e_max > _e_raw[-1]:
+                    raise ValueError("The cross-sections of '{}' in '{}' do not cover the range ({}, {}) eV, "
+                                     "please adjust to numbers within ({}, {}) eV.".format(each_ele, each_layer,
+                                                                                           e_min, e_max,
+                                                                                           _e_raw[0], _e_raw[-1]))
+
+
+def get_raw_sigma_of_stack(o_stack, database):
+    """ Returns {layer: {element: [(isotopic_ratio, energy_eV, sigma_b), ...]}} of the raw cross-sections. """
+    _database_folder = os.path.join(ir_ref_data_path, database)
+    raw_sigma_dict = {}
+    for each_layer in o_stack.keys():
+        raw_sigma_dict[each_layer] = {}
+        for each_ele in o_stack[each_layer]['elements']:
+            _isotopes = o_stack[each_layer][each_ele]['isotopes']
+            _iso_list = []
+            for _iso, _file, _ratio in zip(_isotopes['list'], _isotopes['file_names'], _isotopes['isotopic_ratio']):
+                # Same files as ImagingReso, bonded H replaces '1-H' of the listed compounds
+                if each_layer in ir_util.h_bond_list and _iso == '1-H':
+                    _sigma_file = os.path.join(ir_ref_data_path, 'Bonded_H', 'H-{}.csv'.format(each_layer))
+                else:
+                    _sigma_file = os.path.join(_database_folder, _file)
+                _iso_list.append((_ratio,) + get_raw_sigma(sigma_file=_sigma_file))
+            raw_sigma_dict[each_layer][each_ele] = _iso_list
+    return raw_sigma_dict
+
+
+def get_raw_sigma(sigma_file):
+    """ Returns the raw energy (eV) and sigma (barn) arrays of a cross-section file, sorted by energy. """
+    if sigma_file not in _raw_sigma_cache:
+        _data = ir_util.get_database_data(file_name=sigma_file)
+        _energy = np.asarray(_data['E_eV'], dtype=float)
+        _sigma = np.asarray(_data['Sig_b'], dtype=float)
+        if np.any(np.diff(_energy) < 0):
+            _order = np.argsort(_energy, kind='stable')
+            _energy, _sigma = _energy[_order], _sigma[_order]
+        _raw_sigma_cache[sigma_file] = (_energy, _sigma)
+    return _raw_sigma_cache[sigma_file]
+
+
+def save_input_context(sample_tb_df, iso_tb_df, iso_changed, database):
+    """ Returns the id of the validated input of a submit, for the callbacks of the results (see 'load_input_context').
+
+    The numeric sample table and the isotope table are kept, so that they are neither converted nor formed again.
+    """
+    meta = {'database': database,
+            'iso_changed': list(iso_changed),
+            'sample': sample_tb_df.to_dict('list'),
+            'iso': iso_tb_df.to_dict('list')}
+    return dump_dfs(df_dict={}, meta=meta)
+
+
+def load_input_context(input_id):
+    """ Returns the dict of a validated input saved by 'save_input_context', with 'sample_tb_df' and 'iso_tb_df'. """
+    meta = load_result_meta(result_data=input_id)
+    if 'sample' not in meta:
+        raise PreventUpdate
+    return {'database': meta['database'],
+            'iso_changed': meta['iso_changed'],
+            'sample_tb_df': pd.DataFrame(meta['sample']),
+            'iso_tb_df': pd.DataFrame(meta['iso'])}
+
+
+def form_transmission_result_div(sample_tb_df, iso_tb_df, iso_changed, database,
+                                 beamline, band_min, band_max, band_type, grid='quadrature'):
+    """ Returns the result at 'beamline' and the stack, integrated on the energy 'grid': 'quadrature' the nodes
+    of 'quadrature_integration', 'adaptive' the grid of 'calculate_transmission_adaptive' and 'linear' the grid
+    of ImagingReso.
+    """
+    beamline_name = beamline_name_dict[beamline]
+    if beamline in ['imaging', 'imaging_crop']:
         disclaimer = markdown_disclaimer_hfir
-    # Modify input for testing
-    sample_tb_dict = force_dict_to_numeric(input_dict_list=sample_tb_rows)
-    sample_tb_df = pd.DataFrame(sample_tb_dict)
-    if len(iso_changed) == 1:
-        iso_tb_dict = force_dict_to_numeric(input_dict_list=iso_tb_rows)
-        iso_tb_df = pd.DataFrame(iso_tb_dict)
     else:
-        iso_tb_df = form_iso_table(sample_df=sample_tb_df, database=database)
-
+        disclaimer = markdown_disclaimer_sns
     # Calculation starts
-    total_trans, o_stack = calculate_transmission(sample_tb_df=sample_tb_df,
-                                                  iso_tb_df=iso_tb_df,
-                                                  iso_changed=iso_changed,
-                                                  beamline=beamline,
-                                                  band_min=band_min,
-                                                  band_max=band_max,
-                                                  band_type=band_type,
-                                                  database=database)
+    if grid == 'adaptive':
+        total_trans, o_stack, achieved_error = calculate_transmission_adaptive(sample_tb_df=sample_tb_df,
+                                                                               iso_tb_df=iso_tb_df,
+                                                                               iso_changed=iso_changed,
+                                                                               beamline=beamline,
+                                                                               band_min=band_min,
+                                                                               band_max=band_max,
+                                                                               band_type=band_type,
+                                                                               database=database)
+    elif grid == 'quadrature':
+        total_trans, o_stack = calculate_transmission(sample_tb_df=sample_tb_df,
+                                                      iso_tb_df=iso_tb_df,
+                                                      iso_changed=iso_changed,
+                                                      beamline=beamline,
+                                                      band_min=band_min,
+                                                      band_max=band_max,
+                                                      band_type=band_type,
+                                                      database=database,
+                                                      integration=quadrature_integration,
+                                                      nbr_point=quadrature_nbr_point)
+    else:  # grid == 'linear'
+        total_trans, o_stack = calculate_transmission(sample_tb_df=sample_tb_df,
+                                                      iso_tb_df=iso_tb_df,
+                                                      iso_changed=iso_changed,
+                                                      beamline=beamline,
+                                                      band_min=band_min,
+                                                      band_max=band_max,
+                                                      band_type=band_type,
+                                                      database=database)
     output_div_list = [
         html.Hr(),
         html.H3('Result at ' + beamline_name),
@@ -708,9 +1635,116 @@ def form_transmission_result_div(sample_tb_rows, iso_tb_rows, iso_changed, datab
         disclaimer,
         # html.Div(sample_stack_div_list),
     ]
+    if grid == 'adaptive':
+        output_div_list.insert(4, html.P('Estimated integration error: \u00B1 {:.1e} %'.format(achieved_error)))
+    return output_div_list, o_stack
+
+
+def form_transmission_comparison_div(sample_tb_df, iso_tb_df, iso_changed, database,
+                                     band_min, band_max, band_type):
+    """ Returns the comparison table of the transmission at all beam spectra, and the stack at CG-1D. """
+    # Calculation starts
+    result_dict = calculate_transmission_all(sample_tb_df=sample_tb_df,
+                                             iso_tb_df=iso_tb_df,
+                                             iso_changed=iso_changed,
+                                             band_min=band_min,
+                                             band_max=band_max,
+                                             band_type=band_type,
+                                             database=database)
+    o_stack = None
+    row_list = []
+    for each_beamline, each_result in result_dict.items():
+        _row = {beamline_col_name: beamline_name_dict[each_beamline]}
+        if isinstance(each_result, str):
+            _row[trans_total_name] = each_result
+        else:
+            total_trans, _o_stack = each_result
+            if o_stack is None or each_beamline == 'imaging':
+                o_stack = _o_stack
+            _row[trans_total_name] = round(total_trans, 3)
+            _row[atten_total_name] = round(100 - total_trans, 3)
+            for each_layer in _o_stack.keys():
+                _row[each_layer] = round(_o_stack[each_layer]['transmission'], 3)
+        row_list.append(_row)
+    comparison_df = pd.DataFrame(row_list)
+    output_div_list = [
+        html.Hr(),
+        html.H3('Result at all beam spectra'),
+        html.P("Transmission (%) of the sample and of each layer, with the band width applied to the SNS spectra."),
+        dt.DataTable(data=comparison_df.to_dict('records'),
+                     columns=[{'name': each_col, 'id': each_col} for each_col in comparison_df.columns],
+                     editable=False,
+                     row_selectable=False,
+                     filter_action='none',
+                     sort_action='none',
+                     row_deletable=False,
+                     style_data_conditional=[striped_rows],
+                     ),
+        markdown_disclaimer_hfir,
+        markdown_disclaimer_sns,
+    ]
     return output_div_list, o_stack
 
 
+def form_thickness_solution_div(sample_tb_df, iso_tb_df, iso_changed, database,
+                                beamline, band_min, band_max, band_type, target_trans, grid='quadrature'):
+    """ Returns the table of the thickness of each layer that gives the target total transmission,
+    the other layers keeping their thickness.
+
+    'grid' is the one of the transmission shown with it (see 'init_thickness_sweep'). With 'all', the thickness
+    is solved at every beam spectrum on the grid of its result ('get_transmission_grid'), one column each.
+    """
+    if beamline == 'all':
+        beamline_list = list(beam_shape_path_dict.keys())
+        grid_dict = {each: get_transmission_grid(beamline=each) for each in beamline_list}
+        target_col_dict = {each: '{} (mm)'.format(beamline_name_dict[each]) for each in beamline_list}
+        heading = 'Thickness for {} % transmission at all beam spectra:'.format(target_trans)
+    else:
+        beamline_list = [beamline]
+        grid_dict = {beamline: grid}
+        target_col_dict = {beamline: 'Thickness for {} % (mm)'.format(target_trans)}
+        heading = 'Thickness for {} % transmission at {}:'.format(target_trans, beamline_name_dict[beamline])
+    row_list = [{layer_name: each_layer, thick_name: each_thickness}
+                for each_layer, each_thickness in zip(sample_tb_df[chem_name], sample_tb_df[thick_name])]
+    for each_beamline in beamline_list:
+        target_col_name = target_col_dict[each_beamline]
+        try:
+            stack_sweep_dict = init_thickness_sweep(sample_tb_df=sample_tb_df,
+                                                    iso_tb_df=iso_tb_df,
+                                                    iso_changed=iso_changed,
+                                                    beamline=each_beamline,
+                                                    band_min=band_min,
+                                                    band_max=band_max,
+                                                    band_type=band_type,
+                                                    database=database,
+                                                    grid=grid_dict[each_beamline])
+        except Exception as error_message:  # e.g. the spectrum is not covered by the cross-sections
+            for _row in row_list:
+                _row[target_col_name] = str(error_message)
+            continue
+        for _row in row_list:
+            try:
+                sweep_dict = get_layer_sweep(stack_sweep_dict=stack_sweep_dict, layer=_row[layer_name])
+                _row[target_col_name] = '{:0.4g}'.format(solve_thickness(sweep_dict=sweep_dict,
+                                                                         target_trans=target_trans))
+            except Exception as error_message:  # e.g. no thickness reaches the target, shown for this layer only
+                _row[target_col_name] = str(error_message)
+    solution_df = pd.DataFrame(row_list)
+    output_div_list = [
+        html.H4(heading),
+        dt.DataTable(data=solution_df.to_dict('records'),
+                     columns=[{'name': each_col, 'id': each_col} for each_col in solution_df.columns],
+                     editable=False,
+                     row_selectable=False,
+                     filter_action='none',
+                     sort_action='none',
+                     row_deletable=False,
+                     style_data_conditional=[striped_rows],
+                     ),
+    ]
+    return output_div_list
+
+
 def form_sample_stack_table_div(o_stack, full_stack=True):
     sample_stack_div_list = [html.Hr(), html.H4('Sample stack:')]
     layers = list(o_stack.keys())
@@ -876,50 +1910,43 @@ def convert_to_effective_formula(ele_list, mol_list):
 
 
 def form_iso_table(sample_df: pd.DataFrame, database: str):
-    o_reso = Resonance(energy_min=1, energy_max=2, energy_step=1, database=database)
-    o_reso = unpack_sample_tb_df_and_add_layer(o_reso=o_reso, sample_tb_df=sample_df)
-    layer_list = list(o_reso.stack.keys())
-    lay_list = []
-    ele_list = []
-    iso_list = []
-    iso_ratio_list = []
-    for each_layer in layer_list:
-        current_ele_list = o_reso.stack[each_layer]['elements']
-        for each_ele in current_ele_list:
-            current_iso_list = o_reso.stack[each_layer][each_ele]['isotopes']['list']
-            current_iso_ratio_list = o_reso.stack[each_layer][each_ele]['isotopes']['isotopic_ratio']
-            for i, each_iso in enumerate(current_iso_list):
-                lay_list.append(each_layer)
-                ele_list.append(each_ele)
-                iso_list.append(each_iso)
-                iso_ratio_list.append(round(current_iso_ratio_list[i], 4))
-
-    _df = pd.DataFrame({
-        layer_name: lay_list,
-        ele_name: ele_list,
-        iso_name: iso_list,
-        iso_ratio_name: iso_ratio_list,
-    })
+    """ Returns the isotope table (natural isotopic ratios) of the layers of 'sample_df',
+    the layers which could not be added to the stack (e.g. invalid or repeated formula) are left out.
+    """
+    _rows = []
+    for each_layer in OrderedDict.fromkeys(sample_df[chem_name]):
+        if not isinstance(each_layer, str) or each_layer == '':
+            continue
+        _rows.extend(_form_iso_rows(each_layer, database))
+
+    _df = pd.DataFrame(_rows, columns=[layer_name, ele_name, iso_name, iso_ratio_name])
     return _df
 
 
 def update_new_iso_table(prev_iso_df: pd.DataFrame, new_iso_df: pd.DataFrame):
-    prev_iso_layer_list = list(prev_iso_df[layer_name])  # previous list of layers
-    new_iso_layer_list = list(new_iso_df[layer_name])  # new list of layers
-
-    prev_index = []  # index of the new layers that exists in prev layers
-    new_index = []  # index of the prev layers that needs to be passed along
-    for line_idx, each_new_layer in enumerate(new_iso_layer_list):
-        if each_new_layer in prev_iso_layer_list:
-            new_index.append(line_idx)
-    for line_idx, each_prev_layer in enumerate(prev_iso_layer_list):
-        if each_prev_layer in new_iso_layer_list:
-            prev_index.append(line_idx)
-
-    if len(prev_index) != 0:
-        for idx, each in enumerate(new_index):
-            new_iso_df.iloc[each] = prev_iso_df.loc[prev_index[idx]]
-
+    """ Returns 'new_iso_df' with the isotopic ratios of 'prev_iso_df' carried over.
+
+    Rows are matched on (layer, element, isotope). A layer whose isotopes are not exactly the previous ones
+    is changed, and gets the natural isotopic ratios of 'new_iso_df'.
+    """
+    key_list = [layer_name, ele_name, iso_name]
+    if all(each in prev_iso_df.columns for each in key_list + [iso_ratio_name]):
+        prev_iso_df = prev_iso_df[key_list + [iso_ratio_name]].drop_duplicates(subset=key_list)
+        prev_iso_df = prev_iso_df[prev_iso_df[layer_name].notna()]
+    else:
+        prev_iso_df = pd.DataFrame(columns=key_list + [iso_ratio_name])
+    merged_df = new_iso_df[key_list].merge(prev_iso_df.rename(columns={iso_ratio_name: '_prev_ratio'}),
+                                           on=key_list, how='left', indicator=True)
+    _matched = (merged_df['_merge'] == 'both').to_numpy()
+
+    new_count = new_iso_df.groupby(layer_name, sort=False).size()
+    matched_count = pd.Series(_matched).groupby(new_iso_df[layer_name].to_numpy(), sort=False).sum()
+    prev_count = prev_iso_df.groupby(layer_name, sort=False).size().reindex(new_count.index)
+    unchanged = (matched_count.reindex(new_count.index) == new_count) & (prev_count == new_count)
+
+    keep = new_iso_df[layer_name].map(unchanged).fillna(False).to_numpy(dtype=bool)
+    new_iso_df[iso_ratio_name] = np.where(keep, merged_df['_prev_ratio'].to_numpy(dtype=object),
+                                          new_iso_df[iso_ratio_name].to_numpy(dtype=object))
     return new_iso_df
 
 
@@ -948,25 +1975,316 @@ def update_range_tb_by_coordinate(range_table_rows, distance, modified_coord):
     return range_table_rows
 
 
-def _load_jsonified_data(jsonified_data):
-    datasets = json.loads(jsonified_data)
-    return datasets
+def save_result(df_dict, meta=None, keep_in_memory=True, result_id=None):
+    """ Keeps the dfs of a result in this worker and on disk for the other workers, returns the result id.
+
+    Columns are kept as numpy arrays, only the id has to go through the browser. 'meta' is a json-able dict
+    of how the result was calculated. A new id is drawn unless 'result_id' is given.
+    """
+    if result_id is None:
+        result_id = uuid.uuid4().hex
+    result = {each_name: (list(each_df.columns), [each_df[each_col].to_numpy() for each_col in each_df.columns])
+              for each_name, each_df in df_dict.items()}
+    result[result_meta_key] = meta or {}
+    if keep_in_memory:
+        _add_to_result_cache(result_id=result_id, result=result)
+    _write_result_file(result_id=result_id, result=result)
+    _remove_old_result_files()
+    return result_id
+
+
+def load_result(result_id):
+    """ Returns the dfs of a result by id, or None if the result no longer exists. """
+    result = _get_result(result_id=result_id)
+    if result is None:
+        return None
+    return {each_name: pd.DataFrame(OrderedDict(zip(*each_value)))
+            for each_name, each_value in result.items() if each_name != result_meta_key}
+
+
+def _get_result(result_id):
+    if not _is_result_id(result_id):
+        return None
+    with _result_cache_lock:
+        if result_id in _result_cache:
+            _result_cache.move_to_end(result_id)
+            result = _result_cache[result_id]
+        else:
+            result = None
+    if result is None:
+        result = _read_result_file(result_id=result_id)
+        if result is None:
+            return None
+        _add_to_result_cache(result_id=result_id, result=result)
+    return result
+
+
+def has_result(result_id):
+    """ Returns whether a result is kept in this worker or on disk. """
+    if not _is_result_id(result_id):
+        return False
+    with _result_cache_lock:
+        if result_id in _result_cache:
+            return True
+    return os.path.exists(_result_file_path(result_id))
+
 
+def _is_result_id(result_id):
+    return isinstance(result_id, str) and len(result_id) == 32 and all(c in '0123456789abcdef' for c in result_id)
+
+
+def _add_to_result_cache(result_id, result):
+    with _result_cache_lock:
+        _result_cache[result_id] = result
+        _result_cache.move_to_end(result_id)
+        while len(_result_cache) > result_cache_max_items:
+            _result_cache.popitem(last=False)
+
+
+def _result_file_path(result_id):
+    return os.path.join(result_store_dir, result_id + '.npz')
+
+
+def _write_result_file(result_id, result):
+    os.makedirs(result_store_dir, exist_ok=True)
+    array_dict = {}
+    col_dict = {}
+    for each_name, each_value in result.items():
+        if each_name == result_meta_key:
+            continue
+        _col_list, _array_list = each_value
+        col_dict[each_name] = _col_list
+        for _i, _array in enumerate(_array_list):
+            array_dict['{}_{}'.format(each_name, _i)] = _array
+    array_dict['columns'] = np.array(json.dumps(col_dict))
+    array_dict['meta'] = np.array(json.dumps(result[result_meta_key]))
+    _tmp_path = _result_file_path(result_id) + '.{}.tmp'.format(os.getpid())
+    with open(_tmp_path, 'wb') as f:
+        np.savez(f, **array_dict)
+    os.replace(_tmp_path, _result_file_path(result_id))
+
+
+def _read_result_file(result_id):
+    try:
+        with np.load(_result_file_path(result_id), allow_pickle=False) as npz:
+            col_dict = json.loads(str(npz['columns']))
+            result = {each_name: (_col_list, [npz['{}_{}'.format(each_name, _i)] for _i in range(len(_col_list))])
+                      for each_name, _col_list in col_dict.items()}
+            result[result_meta_key] = json.loads(str(npz['meta']))
+            return result
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _remove_old_result_files():
+    global _result_store_last_cleanup
+    _now = time.time()
+    if _now - _result_store_last_cleanup < result_store_max_age_s / 24:
+        return
+    _result_store_last_cleanup = _now
+    _file_list = []
+    for each_pattern in ['*.npz', '*.job.json', '*.cancel']:
+        _file_list.extend(glob.glob(os.path.join(result_store_dir, each_pattern)))
+    for each_file in _file_list:
+        try:
+            if _now - os.path.getmtime(each_file) > result_store_max_age_s:
+                os.remove(each_file)
+        except OSError:
+            pass  # removed by another worker
+
+
+def get_reso_job_pool():
+    """ Returns the job pool of this worker, started on first use. """
+    global _reso_job_pool
+    if _reso_job_pool is None:
+        _reso_job_pool = ProcessPoolExecutor(max_workers=reso_job_workers)
+    return _reso_job_pool
 
-def _extract_df(datasets):
-    df_name_list = ['x', 'y']
-    df_dict = {}
-    for each_name in df_name_list:
-        df_dict[each_name] = pd.read_json(datasets[each_name], orient='split')
-    return df_dict
 
+def shutdown_reso_job_pool():
+    global _reso_job_pool
+    if _reso_job_pool is not None:
+        _reso_job_pool.shutdown(wait=False)
+        _reso_job_pool = None
 
-def load_dfs(jsonified_data):
-    datasets = _load_jsonified_data(jsonified_data=jsonified_data)
-    df_dict = _extract_df(datasets=datasets)
+
+def submit_reso_job(result_key, params, e_step, meta=None):
+    """ Queues the calculation of a resonance result (see 'calculate_reso_sigma') and returns its job id.
+
+    The job state is read with 'get_reso_job_state', by any worker sharing 'result_store_dir'.
+    """
+    job_id = uuid.uuid4().hex
+    _write_reso_job_state(job_id=job_id, state={'status': 'queued', 'progress': 0})
+    _kwargs = dict(job_id=job_id, result_key=result_key, params=params, e_step=e_step, meta=meta)
+    try:
+        future = get_reso_job_pool().submit(run_reso_job, **_kwargs)
+    except (BrokenProcessPool, OSError, RuntimeError):
+        # Computed here if the pool is not available
+        shutdown_reso_job_pool()
+        run_reso_job(**_kwargs)
+        return job_id
+    _reso_job_future_dict[job_id] = future
+    future.add_done_callback(functools.partial(_on_reso_job_done, job_id))
+    return job_id
+
+
+def _on_reso_job_done(job_id, future):
+    _reso_job_future_dict.pop(job_id, None)
+    if future.cancelled():
+        _write_reso_job_state(job_id=job_id, state={'status': 'cancelled', 'progress': 0})
+    elif future.exception() is not None:
+        # e.g. the process of the job was killed
+        _write_reso_job_state(job_id=job_id, state={'status': 'error', 'progress': 0,
+                                                    'error': str(future.exception())})
+
+
+def run_reso_job(job_id, result_key, params, e_step, meta=None):
+    """ Computes a resonance result chunk by chunk, keeping its job state up to date, until done or cancelled.
+
+    The result is stored by 'save_reso_result' under 'result_key', given as the 'result_id' of the job state.
+    """
+    def _on_progress(fraction):
+        if os.path.exists(_reso_job_file_path(job_id=job_id, ext='.cancel')):
+            return False
+        _write_reso_job_state(job_id=job_id, state={'status': 'running', 'progress': fraction})
+        return True
+
+    try:
+        if not _on_progress(0):
+            result = None
+        else:
+            result = calculate_reso_sigma_by_chunk(e_step=e_step, on_progress=_on_progress, **params)
+        if result is None:
+            _write_reso_job_state(job_id=job_id, state={'status': 'cancelled', 'progress': 0})
+            return
+        df_dict, stack_list = result
+        save_reso_result(result_key=result_key, df_dict=df_dict, stack_list=stack_list, meta=meta,
+                         keep_in_memory=False)
+        _write_reso_job_state(job_id=job_id, state={'status': 'done', 'progress': 1, 'result_id': result_key})
+    except Exception as error_message:
+        _write_reso_job_state(job_id=job_id, state={'status': 'error', 'progress': 0, 'error': str(error_message)})
+
+
+def cancel_reso_job(job_id):
+    """ Stops a job: a queued job is dropped, a running one stops after its current chunk. """
+    if not _is_result_id(job_id):
+        return
+    os.makedirs(result_store_dir, exist_ok=True)
+    open(_reso_job_file_path(job_id=job_id, ext='.cancel'), 'w').close()
+    future = _reso_job_future_dict.get(job_id)
+    if future is not None:
+        future.cancel()
+
+
+def get_reso_job_state(job_id):
+    """ Returns the state dict of a job: 'status' ('queued', 'running', 'done', 'error' or 'cancelled'),
+    'progress' (0 to 1), 'result_id' once done and 'error' on failure. None if the job is unknown.
+    """
+    if not _is_result_id(job_id):
+        return None
+    try:
+        with open(_reso_job_file_path(job_id=job_id, ext='.job.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _reso_job_file_path(job_id, ext):
+    return os.path.join(result_store_dir, job_id + ext)
+
+
+def _write_reso_job_state(job_id, state):
+    os.makedirs(result_store_dir, exist_ok=True)
+    _path = _reso_job_file_path(job_id=job_id, ext='.job.json')
+    _tmp_path = _path + '.{}.tmp'.format(os.getpid())
+    with open(_tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(_tmp_path, _path)
+
+
+def form_reso_job_div(state):
+    """ Returns the progress (or error) of a job to show while its result is computed. """
+    if state is None:
+        return html.P('ERROR: the calculation was lost, please submit again.')
+    if state['status'] == 'error':
+        return html.P('ERROR: {}'.format(state['error']))
+    if state['status'] == 'queued':
+        return html.P('Calculation queued...')
+    return html.Div([
+        html.P('Calculating... {:.0f}%'.format(state['progress'] * 100)),
+        html.Progress(value=str(state['progress']), max='1'),
+    ])
+
+
+def encode_df(df: pd.DataFrame, float_dtype='<f8'):
+    """ Returns a json-able dict packing each column as base64 little-endian binary with a small schema header.
+
+    Float columns use 'float_dtype' ('<f8' or '<f4'), signed, unsigned and bool columns keep their kind as
+    '<i8', '<u8' and '|b1', other columns are kept as lists.
+    """
+    col_list = []
+    for each_col in df.columns:
+        _array = df[each_col].to_numpy()
+        if _array.dtype.kind == 'f':
+            _dtype = float_dtype
+        elif _array.dtype.kind in 'iub':
+            _dtype = {'i': '<i8', 'u': '<u8', 'b': '|b1'}[_array.dtype.kind]
+        else:
+            col_list.append({'name': each_col, 'dtype': 'list', 'data': _array.tolist()})
+            continue
+        _bytes = np.ascontiguousarray(_array, dtype=_dtype).tobytes()
+        col_list.append({'name': each_col, 'dtype': _dtype, 'data': base64.b64encode(_bytes).decode('ascii')})
+    return {'length': len(df), 'columns': col_list}
+
+
+def decode_df(encoded: dict):
+    """ Returns the df packed by 'encode_df', float32 columns are restored as float64. """
+    col_dict = OrderedDict()
+    for each_col in encoded['columns']:
+        if each_col['dtype'] == 'list':
+            col_dict[each_col['name']] = each_col['data']
+        else:
+            _array = np.frombuffer(base64.b64decode(each_col['data']), dtype=each_col['dtype'])
+            col_dict[each_col['name']] = _array.astype(float if _array.dtype.kind == 'f' else _array.dtype.type)
+    return pd.DataFrame(col_dict, index=pd.RangeIndex(encoded['length']))
+
+
+def dump_dfs(df_dict, meta=None):
+    """ Returns what the browser keeps of a result: its id in the result store, or the binary encoded dfs
+    when 'NEUIT_RESULT_STORE' is '0' (e.g. instances without a shared disk).
+    """
+    if result_store_enabled:
+        return save_result(df_dict=df_dict, meta=meta)
+    encoded_dict = {each_name: encode_df(each_df) for each_name, each_df in df_dict.items()}
+    encoded_dict[result_meta_key] = meta or {}
+    return json.dumps(encoded_dict)
+
+
+def load_dfs(result_data):
+    if _is_result_id(result_data):
+        df_dict = load_result(result_id=result_data)
+    elif result_data is not None:
+        df_dict = {each_name: decode_df(each_encoded) for each_name, each_encoded in json.loads(result_data).items()
+                   if each_name != result_meta_key}
+    else:
+        df_dict = None
+    if df_dict is None:
+        raise PreventUpdate
     return df_dict
 
 
+def load_result_meta(result_data):
+    """ Returns the 'meta' dict saved with a result, empty if there is none. """
+    if _is_result_id(result_data):
+        result = _get_result(result_id=result_data)
+        if result is None:
+            raise PreventUpdate
+        return result[result_meta_key]
+    elif result_data is not None:
+        return json.loads(result_data).get(result_meta_key, {})
+    return {}
+
+
 def x_type_to_x_tag(x_type):
     # Determine X names to plot
     if x_type == 'energy':
@@ -1006,8 +2324,307 @@ def x_type_to_x_label(x_type):
     return x_label
 
 
-def shape_reso_df_to_output(y_type, x_type, show_opt, jsonified_data, prev_show_opt, to_csv):
-    df_dict = load_dfs(jsonified_data=jsonified_data)
+def calculate_reso_sigma(e_min, e_max, e_step, database, sample_tb_dict, iso_tb_dict, iso_changed, distance_m,
+                         use_cache=True):
+    """ Returns what every y type of a sample stack is derived from (see 'derive_reso_y'), from 'e_min' to 'e_max':
+    the x df (all x types), the raw cross-section df (one 'layer/element/isotope' column per isotope) and the list
+    of the isotopes with their isotopic ratio, number density and layer thickness.
+
+    'sample_tb_dict' and 'iso_tb_dict' are the validated tables of an input context (see 'save_input_context').
+    'use_cache' is passed to 'init_reso'.
+    """
+    sample_tb_df = pd.DataFrame(sample_tb_dict)
+    iso_tb_df = pd.DataFrame(iso_tb_dict)
+    o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=e_step, database=database,
+                       sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed, use_cache=use_cache)
+    o_stack = o_reso.stack
+    stack_list = []
+    sigma_dict = OrderedDict()
+    for each_layer in o_stack.keys():
+        _thickness_cm = _layer_thickness_cm(o_stack=o_stack, layer=each_layer)
+        for each_ele in o_stack[each_layer]['elements']:
+            _iso_dict = o_stack[each_layer][each_ele]['isotopes']
+            for each_iso, each_ratio in zip(_iso_dict['list'], _iso_dict['isotopic_ratio']):
+                stack_list.append({'layer': each_layer, 'element': each_ele, 'isotope': each_iso,
+                                   'ratio': float(each_ratio),
+                                   'atoms_per_cm3': float(o_stack[each_layer][each_ele]['atoms_per_cm3']),
+                                   'thickness_cm': float(_thickness_cm)})
+                sigma_dict['/'.join([each_layer, each_ele, each_iso])] = \
+                    o_reso.stack_sigma[each_layer][each_ele][each_iso]['sigma_b_raw']
+
+    df_x = pd.DataFrame()
+    df_x[energy_name] = o_reso.total_signal['energy_eV']
+    df_x = fill_df_x_types(df=df_x, distance_m=distance_m)
+    return {'x': df_x, 'sigma': pd.DataFrame(sigma_dict)}, stack_list
+
+
+def derive_reso_y(df_sigma, stack_list, y_type, level_list=None):
+    """ Returns the y df of 'y_type' with the columns of 'level_list' (all if None), the same as
+    'Resonance.export', derived from the raw cross-sections of 'calculate_reso_sigma'.
+    """
+    if level_list is None:
+        level_list = reso_level_list + ['atoms']
+    iso_path_list = list(df_sigma.columns)
+    ele_path_list = list(OrderedDict.fromkeys(each.rsplit('/', 1)[0] for each in iso_path_list))
+    layer_list = list(OrderedDict.fromkeys(each['layer'] for each in stack_list))
+    # Isotopes are grouped by element and elements by layer, each group is reduced from its first row
+    ele_start = np.array([[each.rsplit('/', 1)[0] for each in iso_path_list].index(_ele) for _ele in ele_path_list])
+    layer_start = np.array([[each.split('/')[0] for each in ele_path_list].index(_layer) for _layer in layer_list])
+    ratio = np.array([each['ratio'] for each in stack_list])[:, None]
+    atoms_ele = np.array([stack_list[_i]['atoms_per_cm3'] for _i in ele_start])[:, None]
+    thickness_ele = np.array([stack_list[_i]['thickness_cm'] for _i in ele_start])[:, None]
+
+    sigma_iso = df_sigma.to_numpy().T * ratio
+    sigma_ele = np.add.reduceat(sigma_iso, ele_start, axis=0)
+    y_dict = OrderedDict()
+    if y_type[:5] == 'sigma':
+        if y_type == 'sigma_raw':
+            sigma_iso = df_sigma.to_numpy().T
+        nbr_point = len(df_sigma)
+        iso_end = np.append(ele_start[1:], len(iso_path_list))
+        for _i, each_ele in enumerate(ele_path_list):
+            if 'atoms' in level_list:
+                y_dict[each_ele + '/atoms_per_cm3'] = np.full(nbr_point, atoms_ele[_i, 0])
+            if 'ele' in level_list:
+                y_dict[each_ele] = sigma_ele[_i]
+            if 'iso' in level_list:
+                for _j in range(ele_start[_i], iso_end[_i]):
+                    y_dict[iso_path_list[_j]] = sigma_iso[_j]
+        return pd.DataFrame(y_dict, columns=[each for each in y_dict.keys()])
+
+    mu_ele = 1e-24 * atoms_ele * sigma_ele
+    mu_layer = np.add.reduceat(mu_ele, layer_start, axis=0)
+    if y_type == 'mu_per_cm':
+        y_iso, y_ele, y_layer = None, mu_ele, mu_layer
+        if 'iso' in level_list:
+            y_iso = 1e-24 * np.repeat(atoms_ele, np.diff(np.append(ele_start, len(iso_path_list))), axis=0) * sigma_iso
+    else:
+        # Same as the products of the element (layer) transmissions, summed in the exponent
+        thickness_layer = thickness_ele[layer_start]
+        y_ele = np.exp(-thickness_ele * mu_ele)
+        y_layer = np.exp(-thickness_layer * mu_layer)
+        y_total = np.exp(-np.sum(thickness_layer * mu_layer, axis=0))
+        y_iso = None
+        if 'iso' in level_list:
+            _repeat = np.diff(np.append(ele_start, len(iso_path_list)))
+            y_iso = np.exp(-np.repeat(thickness_ele * atoms_ele, _repeat, axis=0) * 1e-24 * sigma_iso)
+        if y_type == 'attenuation':
+            y_ele, y_layer, y_total = 1. - y_ele, 1. - y_layer, 1. - y_total
+            y_iso = None if y_iso is None else 1. - y_iso
+        if 'total' in level_list:
+            y_dict['Total_' + y_type] = y_total
+    if 'layer' in level_list:
+        for _i, each_layer in enumerate(layer_list):
+            y_dict[each_layer] = y_layer[_i]
+    if 'ele' in level_list:
+        for _i, each_ele in enumerate(ele_path_list):
+            y_dict[each_ele] = y_ele[_i]
+    if 'iso' in level_list:
+        for _i, each_iso in enumerate(iso_path_list):
+            y_dict[each_iso] = y_iso[_i]
+    return pd.DataFrame(y_dict, columns=[each for each in y_dict.keys()])
+
+
+def calculate_reso_dfs(e_min, e_max, e_step, database, sample_tb_dict, iso_tb_dict, iso_changed, y_type, distance_m,
+                       level_list=None, use_cache=True):
+    """ Returns the x df (all x types) and y df (one column per curve) of a sample stack from 'e_min' to 'e_max'.
+
+    Only the columns of 'level_list' (see 'get_reso_col_level') are derived, all of them if None. 'use_cache' is
+    passed to 'init_reso'.
+    """
+    df_dict, stack_list = calculate_reso_sigma(e_min=e_min, e_max=e_max, e_step=e_step, database=database,
+                                               sample_tb_dict=sample_tb_dict, iso_tb_dict=iso_tb_dict,
+                                               iso_changed=iso_changed, distance_m=distance_m, use_cache=use_cache)
+    df_y = derive_reso_y(df_sigma=df_dict['sigma'], stack_list=stack_list, y_type=y_type, level_list=level_list)
+    return {'x': df_dict['x'], 'y': df_y}
+
+
+def get_reso_col_level(col_name):
+    """ Returns the level of a column of a resonance result: 'total', 'layer', 'ele', 'iso' or 'atoms'. """
+    if col_name.count('Total') != 0:
+        return 'total'
+    _num_of_slash = col_name.count('/')
+    if _num_of_slash == 0:
+        return 'layer'
+    elif _num_of_slash == 1:
+        return 'ele'
+    elif col_name.count('atoms_per_cm3') != 0:
+        return 'atoms'
+    return 'iso'
+
+
+def get_reso_level_list(y_type, show_opt):
+    """ Returns the column levels needed to show 'show_opt', cross-sections come with the number densities. """
+    level_list = [each for each in reso_level_list if each in show_opt]
+    if y_type[:5] == 'sigma':
+        level_list.append('atoms')
+    return level_list
+
+
+def get_reso_result_key(params, e_step):
+    """ Returns the id under which a resonance result is stored, the same for all its y types. """
+    return hashlib.sha1(json.dumps([params, e_step], sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def save_reso_result(result_key, df_dict, stack_list, meta=None, keep_in_memory=True):
+    """ Stores the x and raw cross-section dfs of 'calculate_reso_sigma' under 'result_key'. """
+    save_result(df_dict=df_dict, meta=dict(meta or {}, stack=stack_list), keep_in_memory=keep_in_memory,
+                result_id=result_key)
+
+
+def dump_reso_result(df_dict, stack_list, meta=None):
+    """ Same as 'save_reso_result', for the browser to keep (see 'dump_dfs'). """
+    return dump_dfs(df_dict=df_dict, meta=dict(meta or {}, stack=stack_list))
+
+
+def load_reso_dfs(result_data, y_type, level_list):
+    """ Returns {'x': df_x, 'y': df_y} of 'y_type' with the columns of 'level_list' of a resonance result.
+
+    'result_data' is a key of 'save_reso_result' or the output of 'dump_reso_result'.
+    """
+    df_dict = load_dfs(result_data=result_data)
+    stack_list = load_result_meta(result_data=result_data)['stack']
+    df_y = derive_reso_y(df_sigma=df_dict['sigma'], stack_list=stack_list, y_type=y_type, level_list=level_list)
+    return {'x': df_dict['x'], 'y': df_y}
+
+
+def split_energy_range(e_min, e_max, e_step, max_points=reso_job_chunk_points):
+    """ Returns the [(e_min, e_max), ...] of chunks of at most 'max_points' points covering 'e_min' to 'e_max'.
+
+    Chunk edges are on the 'e_step' grid from 'e_min', each edge is shared by two neighbouring chunks.
+    """
+    nbr_step = int((e_max - e_min) / e_step)
+    edge_list = [e_min + _i * e_step for _i in range(0, nbr_step, max_points - 1)] + [e_max]
+    if len(edge_list) > 2 and edge_list[-1] - edge_list[-2] < e_step:
+        # The last chunk would be shorter than one step
+        del edge_list[-2]
+    return list(zip(edge_list[:-1], edge_list[1:]))
+
+
+def iter_reso_sigma_chunks(e_min, e_max, e_step, **kwargs):
+    """ Yields ('fraction' done, df_dict, stack_list) of 'calculate_reso_sigma' over the energy chunks of
+    'split_energy_range', without the point shared with the previous chunk. The chunks are not cached.
+    """
+    chunk_list = split_energy_range(e_min=e_min, e_max=e_max, e_step=e_step)
+    for _i, (_e_min, _e_max) in enumerate(chunk_list):
+        # Inner chunks span a whole number of steps, a hair smaller step keeps their last point
+        _e_step = e_step if _i == len(chunk_list) - 1 else e_step * (1 - 1e-9)
+        _df_dict, stack_list = calculate_reso_sigma(e_min=_e_min, e_max=_e_max, e_step=_e_step, use_cache=False,
+                                                    **kwargs)
+        _start = 0 if _i == 0 else 1  # the first point is the last one of the previous chunk
+        _df_dict = {each_name: each_df.iloc[_start:] for each_name, each_df in _df_dict.items()}
+        yield (_i + 1) / len(chunk_list), _df_dict, stack_list
+
+
+def calculate_reso_sigma_by_chunk(e_min, e_max, e_step, on_progress=None, **kwargs):
+    """ Same as 'calculate_reso_sigma', computed over the energy chunks of 'split_energy_range'.
+
+    'on_progress(fraction)' is called after each chunk, returning False stops the calculation and None is returned.
+    """
+    df_list_dict = {'x': [], 'sigma': []}
+    stack_list = None
+    for _fraction, _df_dict, stack_list in iter_reso_sigma_chunks(e_min=e_min, e_max=e_max, e_step=e_step, **kwargs):
+        for each_name in df_list_dict.keys():
+            df_list_dict[each_name].append(_df_dict[each_name])
+        if on_progress is not None and on_progress(_fraction) is False:
+            return None
+    return {each_name: pd.concat(each_list, ignore_index=True) for each_name, each_list in df_list_dict.items()}, \
+        stack_list
+
+
+def get_reso_export_url(result_id, x_type, y_type, show_opt):
+    """ Returns the url of the csv of the plotted columns of a stored resonance result (see 'iter_reso_csv'),
+    relative to the path prefix of the app.
+    """
+    query = urlencode([('x_type', x_type), ('y_type', y_type)] + [('show_opt', each) for each in show_opt])
+    return reso_export_path.format(result_id) + '?' + query
+
+
+def get_reso_export_nbr_points(result_data):
+    """ Returns the number of energy points recalculated to export a resonance result, 0 if it is not progressive. """
+    meta = load_result_meta(result_data=result_data)
+    if not meta.get('progressive'):
+        return 0
+    return int((meta['params']['e_max'] - meta['params']['e_min']) / meta['e_step']) + 1
+
+
+def iter_reso_csv(result_id, x_type, y_type, show_opt, chunk_points=reso_job_chunk_points):
+    """ Yields the csv of the columns of 'show_opt' of a stored resonance result, 'chunk_points' rows at a time.
+
+    Only one chunk of y values is derived at a time. Progressive results are recalculated at their
+    requested energy step chunk by chunk.
+    """
+    meta = load_result_meta(result_data=result_id)
+    level_list = get_reso_level_list(y_type=y_type, show_opt=show_opt)
+    if meta.get('progressive'):
+        sigma_chunks = (_chunk[1:] for _chunk in iter_reso_sigma_chunks(e_step=meta['e_step'], **meta['params']))
+    else:
+        df_dict = load_dfs(result_data=result_id)
+        sigma_chunks = (({each_name: each_df.iloc[_start:_start + chunk_points]
+                          for each_name, each_df in df_dict.items()}, meta['stack'])
+                        for _start in range(0, len(df_dict['x']), chunk_points))
+    x_tag = x_type_to_x_tag(x_type)
+    for _i, (_df_dict, stack_list) in enumerate(sigma_chunks):
+        df_y = derive_reso_y(df_sigma=_df_dict['sigma'], stack_list=stack_list, y_type=y_type, level_list=level_list)
+        df_x, df_y, to_export_list, x_tag, y_label = shape_reso_df_to_output(x_type=x_type,
+                                                                             y_type=y_type,
+                                                                             show_opt=show_opt,
+                                                                             result_data=None,
+                                                                             prev_show_opt=None,
+                                                                             to_csv=True,
+                                                                             df_dict={'x': _df_dict['x'], 'y': df_y})
+        df_to_export = df_y[to_export_list]
+        df_to_export.insert(loc=0, column=x_tag, value=df_x[x_tag].to_numpy())
+        yield df_to_export.to_csv(index=False, header=_i == 0)
+
+
+def get_progressive_e_step(e_min, e_max, e_step, max_points=progressive_max_points):
+    """ Returns 'e_step', or the coarser step giving 'max_points' points when 'e_step' would give more. """
+    if int((e_max - e_min) / e_step) + 1 > max_points:
+        return (e_max - e_min) / (max_points - 1)
+    return e_step
+
+
+def calculate_reso_dfs_in_window(meta, df_x, x_tag, x_window, y_type, level_list=None):
+    """ Returns the dfs of a progressive result recalculated at its fine 'e_step' within 'x_window' only.
+
+    The energy window is taken from the coarse points around 'x_window', so that the curves reach its edges.
+    """
+    energy_array = df_x[energy_name].to_numpy()
+    x_array = df_x[x_tag].to_numpy()
+    _in_window = np.flatnonzero((x_array >= x_window[0]) & (x_array <= x_window[1]))
+    if len(_in_window) == 0:
+        # Zoomed in between two coarse points
+        _in_window = np.flatnonzero(x_array >= x_window[0])[:1]
+        if len(_in_window) == 0:
+            return None
+    _index = np.arange(max(_in_window[0] - 1, 0), min(_in_window[-1] + 2, len(x_array)))
+    e_min = max(energy_array[_index].min(), meta['params']['e_min'])
+    e_max = min(energy_array[_index].max(), meta['params']['e_max'])
+    e_step = get_progressive_e_step(e_min=e_min, e_max=e_max, e_step=meta['e_step'])
+    params = dict(meta['params'], e_min=e_min, e_max=e_max, e_step=e_step)
+    return calculate_reso_dfs(y_type=y_type, level_list=level_list, use_cache=False, **params)
+
+
+def set_progressive_note(plotly_fig, meta, window_e_step=None):
+    """ Shows on a figure (or its dict) the energy step of the curves of a progressive result. """
+    if not meta.get('progressive'):
+        return plotly_fig
+    if window_e_step is not None:
+        note = 'Zoomed window at {:.3g} eV step'.format(window_e_step)
+    else:
+        note = 'Preview at {:.3g} eV step, zoom in to refine to {:.3g} eV'.format(meta['preview_e_step'],
+                                                                                  meta['e_step'])
+    plotly_fig['layout']['annotations'] = [{'text': note, 'xref': 'paper', 'yref': 'paper', 'x': 0.01, 'y': 0.99,
+                                            'xanchor': 'left', 'yanchor': 'top', 'showarrow': False,
+                                            'font': {'size': 13, 'color': 'gray'}}]
+    return plotly_fig
+
+
+def shape_reso_df_to_output(y_type, x_type, show_opt, result_data, prev_show_opt, to_csv, df_dict=None):
+    if df_dict is None:
+        df_dict = load_reso_dfs(result_data=result_data, y_type=y_type,
+                                level_list=get_reso_level_list(y_type=y_type, show_opt=show_opt))
     # Determine Y df and y_label to plot
 
     y_label = y_type_to_y_label(y_type)
@@ -1024,20 +2641,10 @@ def shape_reso_df_to_output(y_type, x_type, show_opt, jsonified_data, prev_show_
     ele_col_name_list = []
     iso_col_name_list = []
     atoms_per_cm3_col_name_list = []
+    col_name_list_dict = {'total': total_col_name_list, 'layer': layer_col_name_list, 'ele': ele_col_name_list,
+                          'iso': iso_col_name_list, 'atoms': atoms_per_cm3_col_name_list}
     for col_name in df_y.columns:
-        if col_name.count('Total') == 0:
-            _num_of_slash = col_name.count('/')
-            if _num_of_slash == 0:
-                layer_col_name_list.append(col_name)
-            elif _num_of_slash == 1:
-                ele_col_name_list.append(col_name)
-            elif _num_of_slash == 2:
-                if col_name.count('atoms_per_cm3') != 0:
-                    atoms_per_cm3_col_name_list.append(col_name)
-                else:
-                    iso_col_name_list.append(col_name)
-        else:
-            total_col_name_list.append(col_name)
+        col_name_list_dict[get_reso_col_level(col_name)].append(col_name)
 
     _to_export_list = []
     if len(show_opt) == 0:
@@ -1065,6 +2672,209 @@ def fill_df_x_types(df: pd.DataFrame, distance_m):
     return df
 
 
+def build_plotly_fig(df: pd.DataFrame, x_col, y_label, x_label=None, max_points=None):
+    """ Returns a figure with one 'go.Scattergl' line per column of 'df' other than 'x_col'.
+
+    With 'max_points', longer curves are reduced by 'minmax_downsample'.
+    """
+    if x_label is None:
+        x_label = x_col
+    x_array = df[x_col].to_numpy()
+    trace_list = []
+    for each_col in df.columns:
+        if each_col == x_col:
+            continue
+        _y = df[each_col].to_numpy()
+        _index = slice(None) if max_points is None else minmax_downsample(y=_y, max_points=max_points)
+        trace_list.append(go.Scattergl(x=x_array[_index], y=_y[_index], name=each_col, mode='lines',
+                                       line={'width': 1.5}))
+    axis_style = {'tickfont': {'size': 15}, 'showline': True, 'mirror': 'ticks', 'ticks': 'inside',
+                  'showgrid': False, 'zeroline': False, 'linecolor': 'black'}
+    layout = go.Layout(
+        showlegend=True,
+        autosize=True,
+        height=600,
+        width=plot_width_px,
+        margin={'b': 52, 'l': 80, 'pad': 0, 'r': 15, 't': 15},
+        xaxis=dict(title={'text': x_label, 'font': {'size': 18}}, autorange=True, **axis_style),
+        yaxis=dict(title={'text': y_label, 'font': {'size': 18}}, autorange=True, **axis_style),
+        colorway=plot_colorway,
+        plot_bgcolor='white',
+        hovermode='closest',
+    )
+    return go.Figure(data=trace_list, layout=layout)
+
+
+def minmax_downsample(y, max_points=plot_max_points):
+    """ Returns the sorted indices of at most 'max_points' points of 'y' keeping its envelope.
+
+    'y' is cut in buckets of equal length, the last one taking the remainder, and the min and max of every bucket
+    are kept with both ends, so that no resonance peak or dip is lost.
+    """
+    nbr_point = len(y)
+    if nbr_point <= max_points:
+        return np.arange(nbr_point)
+    # Both ends and two points per bucket
+    nbr_bucket = (max_points - 2) // 2
+    if nbr_bucket < 1:
+        return np.unique(np.linspace(0, nbr_point - 1, max_points).round().astype(int))
+    bucket_size = nbr_point // nbr_bucket
+    _y = np.asarray(y)
+    _last_start = bucket_size * (nbr_bucket - 1)
+    _buckets = _y[:_last_start].reshape(nbr_bucket - 1, bucket_size)
+    _offset = np.arange(nbr_bucket - 1) * bucket_size
+    _last = _y[_last_start:]
+    index_list = [[0, nbr_point - 1],
+                  np.argmin(_buckets, axis=1) + _offset,
+                  np.argmax(_buckets, axis=1) + _offset,
+                  [np.argmin(_last) + _last_start, np.argmax(_last) + _last_start]]
+    return np.unique(np.concatenate(index_list))
+
+
+def get_x_window(relayout_data, x_axis_type):
+    """ Returns the visible x range of a 'relayoutData' event, None for the full range, or False if x is unchanged.
+
+    Ranges of log axes are given in log10.
+    """
+    if not relayout_data:
+        return False
+    if relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        x_range = [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    elif 'xaxis.range' in relayout_data:
+        x_range = list(relayout_data['xaxis.range'])
+    else:
+        return False
+    if x_axis_type == 'log':
+        x_range = [10 ** x_range[0], 10 ** x_range[1]]
+    return min(x_range), max(x_range)
+
+
+def get_show_opt_options(y_type):
+    if y_type in fixed_y_type_list:
+        value_list = ['total', 'layer', 'ele', 'iso']
+    elif y_type == 'mu_per_cm':
+        value_list = ['layer', 'ele', 'iso']
+    elif y_type[-3:] == 'raw':
+        value_list = ['iso']
+    else:
+        value_list = ['ele', 'iso']
+    return [{'label': show_opt_label_dict[each], 'value': each} for each in value_list]
+
+
+def get_plot_scale_options(y_type):
+    if y_type in fixed_y_type_list:
+        value_list = ['linear', 'logx']
+    else:
+        value_list = ['linear', 'logx', 'logy', 'loglog']
+    return [{'label': plot_scale_label_dict[each], 'value': each} for each in value_list]
+
+
+def get_plot_axis_types(plot_scale, y_type):
+    """ Returns the (x, y) axis types of 'plot_scale', transmission and attenuation only have 'linear' and 'logx'. """
+    if y_type in fixed_y_type_list and plot_scale in ['logy', 'loglog']:
+        plot_scale = 'linear'
+    x_axis_type = 'log' if plot_scale in ['logx', 'loglog'] else 'linear'
+    y_axis_type = 'log' if plot_scale in ['logy', 'loglog'] else 'linear'
+    return x_axis_type, y_axis_type
+
+
+def get_clientside_tables_js():
+    """ Returns the script defining the option tables used by 'assets/neuit.js', served at 'clientside_tables_path'. """
+    table_dict = {
+        'show_opt_options': {each: get_show_opt_options(each) for each in y_type_list},
+        'plot_scale_options': {each: get_plot_scale_options(each) for each in y_type_list},
+        'fixed_y_types': fixed_y_type_list,
+        'fixed_y_range': fixed_y_range,
+        'band_units': band_unit_dict,
+        'band_hidden_beamlines': band_hidden_beamline_list,
+    }
+    return 'window.neuitTables = {};\n'.format(json.dumps(table_dict, indent=4))
+
+
+def x_window_to_energy(x_window, x_type, distance_m):
+    """ Returns the energy range (eV) of a visible x range in 'x_type' units. """
+    x_array = np.asarray(x_window, dtype=float)
+    if x_type == 'lambda':
+        energy_array = ir_util.angstroms_to_ev(x_array)
+    elif x_type == 'time':
+        energy_array = ir_util.s_to_ev(array=x_array * 1e-6, source_to_detector_m=distance_m, offset_us=0)
+    else:
+        energy_array = x_array
+    return float(energy_array.min()), float(energy_array.max())
+
+
+def set_reso_fig_meta(plotly_fig, distance_m, x_window=None, y_window=None):
+    """ Keeps in a figure (or its dict) with energies as x what the browser needs to show it in any x type.
+
+    'x_window' is the zoomed energy range, None for the full range. 'y_window' is the zoomed y range with
+    the y axis type it was given in, e.g. {'range': [0, 1], 'axis_type': 'linear'}.
+    """
+    plotly_fig['layout']['meta'] = {'distance_m': distance_m,
+                                    'x_tag_dict': {each_type: x_type_to_x_tag(each_type)
+                                                   for each_type in ['energy', 'lambda', 'time']},
+                                    'x_window': None if x_window is None else list(x_window),
+                                    'y_window': y_window}
+    return plotly_fig
+
+
+def refresh_fig_traces(plotly_fig, df_x, df_y, x_tag, x_window=None, max_points=plot_max_points):
+    """ Refills the traces of a figure (or its dict) from the full resolution data within 'x_window'.
+
+    Traces are matched to the columns of 'df_y' by name.
+    """
+    x_array = df_x[x_tag].to_numpy()
+    _index = slice(None)
+    if x_window is not None:
+        _in_window = np.flatnonzero((x_array >= x_window[0]) & (x_array <= x_window[1]))
+        if len(_in_window) != 0:
+            # One more point on each side so lines reach the edges
+            _index = slice(max(_in_window[0] - 1, 0), _in_window[-1] + 2)
+    x_array = x_array[_index]
+    for each_trace in plotly_fig['data']:
+        if each_trace['name'] not in df_y.columns:
+            continue
+        _y = df_y[each_trace['name']].to_numpy()[_index]
+        _keep = minmax_downsample(y=_y, max_points=max_points)
+        each_trace['x'] = x_array[_keep]
+        each_trace['y'] = _y[_keep]
+    return plotly_fig
+
+
+def set_plot_scale(plotly_fig, plot_scale, y_type, fixed_y_range=True):
+    """ Sets the axis types of a figure (or its dict) for 'plot_scale'.
+
+    With 'fixed_y_range', transmission and attenuation keep a linear y axis over [-0.05, 1.05].
+    """
+    if fixed_y_range and y_type in ['attenuation', 'transmission']:
+        plotly_fig['layout']['yaxis']['autorange'] = False
+        if plot_scale in ['logy', 'loglog']:
+            plot_scale = 'linear'
+    else:
+        plotly_fig['layout']['yaxis']['autorange'] = True
+
+    if plot_scale == 'logx':
+        plotly_fig['layout']['xaxis']['type'] = 'log'
+        plotly_fig['layout']['yaxis']['type'] = 'linear'
+        if fixed_y_range:
+            plotly_fig['layout']['yaxis']['range'] = [-0.05, 1.05]
+    elif plot_scale == 'logy':
+        if y_type not in ['attenuation', 'transmission']:
+            plotly_fig['layout']['xaxis']['type'] = 'linear'
+            plotly_fig['layout']['yaxis']['type'] = 'log'
+    elif plot_scale == 'loglog':
+        if y_type not in ['attenuation', 'transmission']:
+            plotly_fig['layout']['xaxis']['type'] = 'log'
+            plotly_fig['layout']['yaxis']['type'] = 'log'
+    else:
+        plotly_fig['layout']['xaxis']['type'] = 'linear'
+        plotly_fig['layout']['yaxis']['type'] = 'linear'
+        if fixed_y_range:
+            plotly_fig['layout']['yaxis']['range'] = [-0.05, 1.05]
+    return plotly_fig
+
+
 def shape_df_to_plot(df, x_type, distance, delay):
     if x_type == 'lambda':
         df['X'] = ir_util.s_to_angstroms(array=df['X'], source_to_detector_m=distance, offset_us=delay)
@@ -1195,10 +3005,13 @@ def init_app_ids(app_name: str):
     id_dict['iso_check_id'] = app_name + '_iso_check'
     id_dict['iso_div_id'] = app_name + '_iso_input'
     id_dict['iso_table_id'] = app_name + '_iso_table'
+    id_dict['iso_update_interval_id'] = app_name + '_iso_update_interval'
+    id_dict['iso_update_key_id'] = app_name + '_iso_update_key'
     id_dict['submit_button_id'] = app_name + '_submit'
     id_dict['result_id'] = app_name + '_result'
     id_dict['error_id'] = app_name + '_error'
     id_dict['output_id'] = app_name + '_output'
+    id_dict['hidden_input_id'] = app_name + '_hidden_input_id'
 
     if app_name == 'app1':  # id names for app1 only
         id_dict['beamline_id'] = app_name + '_beamline'
@@ -1207,6 +3020,7 @@ def init_app_ids(app_name: str):
         id_dict['band_max_id'] = app_name + '_band_max'
         id_dict['band_type_id'] = app_name + '_band_type'
         id_dict['band_unit_id'] = app_name + '_band_unit'
+        id_dict['target_trans_id'] = app_name + '_target_trans'
 
     elif app_name == 'app2':  # id names for app2 only
         id_dict['slider_id'] = app_name + '_e_range_slider'
@@ -1215,7 +3029,7 @@ def init_app_ids(app_name: str):
         id_dict['distance_id'] = app_name + '_distance'
         id_dict['hidden_prev_distance_id'] = app_name + '_hidden_prev_distance'
         id_dict['hidden_range_input_coord_id'] = app_name + '_hidden_range_input_coord'
-        id_dict['hidden_df_json_id'] = app_name + '_hidden_df_json'
+        id_dict['hidden_result_id'] = app_name + '_hidden_result_id'
         id_dict['hidden_df_tb_div'] = app_name + '_hidden_df_tb_div'
         id_dict['hidden_df_tb'] = app_name + '_hidden_df_tb'
         id_dict['plot_div_id'] = app_name + '_plot'
@@ -1223,7 +3037,10 @@ def init_app_ids(app_name: str):
         id_dict['plot_options_div_id'] = app_name + '_plot_options'
         id_dict['export_plot_data_button_id'] = app_name + '_plot_data_export'
         id_dict['export_plot_data_notice_id'] = app_name + '_export_notice'
-        id_dict['prev_x_type_id'] = app_name + '_prev_x_type'
+        id_dict['plot_fig_store_id'] = app_name + '_plot_fig_store'
+        id_dict['hidden_job_id'] = app_name + '_hidden_job_id'
+        id_dict['job_interval_id'] = app_name + '_job_interval'
+        id_dict['job_progress_id'] = app_name + '_job_progress'
 
     elif app_name == 'app3':  # id names for app3 only
         id_dict['compos_type_id'] = app_name + '_compos_input_type'
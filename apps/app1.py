@@ -1,4 +1,4 @@
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 
 from _app import app
 from _utilities import *
@@ -32,7 +32,8 @@ layout = html.Div(
                                         {'label': 'IMAGING (CG-1D), HFIR', 'value': 'imaging'},
                                         {'label': u'IMAGING (CG-1D) \u2264 5.35 \u212B, HFIR', 'value': 'imaging_crop'},
                                         {'label': 'SNAP (BL-3), SNS', 'value': 'snap'},
-                                        # {'label': 'SNS, VENUS (BL-10)', 'value': 'venus'},
+                                        {'label': 'VENUS (BL-10), SNS', 'value': 'venus'},
+                                        {'label': 'All (comparison)', 'value': 'all'},
                                     ],
                                     value='imaging',
                                     searchable=False,
@@ -127,6 +128,18 @@ layout = html.Div(
                     id=app_id_dict['iso_div_id'],
                     style={'display': 'none'},
                 ),
+                html.Div(
+                    [
+                        html.H6('Solve thickness for a target transmission (optional):'),
+                        dcc.Input(id=app_id_dict['target_trans_id'], type='number',
+                                  inputMode='numeric',
+                                  placeholder=target_trans_name,
+                                  min=0,
+                                  max=100,
+                                  step=0.1,
+                                  ),
+                    ]
+                ),
                 html.Button('Submit', id=app_id_dict['submit_button_id']),
             ]
         ),
@@ -134,6 +147,14 @@ layout = html.Div(
         # Error message div
         html.Div(id=app_id_dict['error_id'], children=None),
 
+        # Id of the validated input
+        html.Div(id=app_id_dict['hidden_input_id'], style={'display': 'none'}),
+
+        # Fires 'iso_update_delay_ms' after the last edit of the sample table, to update the isotope table
+        dcc.Interval(id=app_id_dict['iso_update_interval_id'], interval=iso_update_delay_ms, max_intervals=0),
+        # Key of the sample table the isotope table was last formed from
+        dcc.Store(id=app_id_dict['iso_update_key_id']),
+
         # Output div
         html.Div(
             [
@@ -147,7 +168,8 @@ layout = html.Div(
 )
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_hide_band_input'),
     Output(app_id_dict['band_div_id'], 'style'),
     [
         Input(app_id_dict['beamline_id'], 'value'),
@@ -155,24 +177,14 @@ layout = html.Div(
     [
         State(app_id_dict['band_div_id'], 'style'),
     ])
-def show_hide_band_input(beamline, style):
-    if beamline in ['imaging', 'imaging_crop']:
-        style['display'] = 'none'
-    else:
-        style['display'] = 'block'
-    return style
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_band_units'),
     Output(app_id_dict['band_unit_id'], 'children'),
     [
         Input(app_id_dict['band_type_id'], 'value'),
     ])
-def show_band_units(band_type):
-    if band_type == 'lambda':
-        return '\u212B'
-    else:
-        return 'eV'
 
 
 @app.callback(
@@ -205,24 +217,45 @@ def update_rows(n_add, n_del, list_of_contents, upload_time, prev_upload_time, l
     return rows, error_message, upload_t
 
 
-@app.callback(
-    Output(app_id_dict['iso_table_id'], 'data'),
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='schedule_iso_update'),
+    [
+        Output(app_id_dict['iso_update_interval_id'], 'interval'),
+        Output(app_id_dict['iso_update_interval_id'], 'max_intervals'),
+    ],
     [
         Input(app_id_dict['database_id'], 'value'),
         Input(app_id_dict['sample_table_id'], 'data'),
+    ],
+    [
+        State(app_id_dict['iso_update_interval_id'], 'interval'),
+        State(app_id_dict['iso_update_interval_id'], 'n_intervals'),
+    ])
+
 
+@app.callback(
+    [
+        Output(app_id_dict['iso_table_id'], 'data'),
+        Output(app_id_dict['iso_update_key_id'], 'data'),
+    ],
+    [
+        Input(app_id_dict['iso_update_interval_id'], 'n_intervals'),
     ],
     [
+        State(app_id_dict['database_id'], 'value'),
+        State(app_id_dict['sample_table_id'], 'data'),
         State(app_id_dict['iso_table_id'], 'data'),
+        State(app_id_dict['iso_update_key_id'], 'data'),
     ])
-def update_iso_table(database, sample_tb_rows, prev_iso_tb_rows):
-    return_dict = update_iso_table_callback(sample_tb_rows=sample_tb_rows,
-                                            prev_iso_tb_rows=prev_iso_tb_rows,
-                                            database=database)
-    return return_dict
+def update_iso_table(n_intervals, database, sample_tb_rows, prev_iso_tb_rows, prev_update_key):
+    return update_iso_table_callback(sample_tb_rows=sample_tb_rows,
+                                     prev_iso_tb_rows=prev_iso_tb_rows,
+                                     database=database,
+                                     prev_update_key=prev_update_key)
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_hide_iso_table'),
     Output(app_id_dict['iso_div_id'], 'style'),
     [
         Input(app_id_dict['iso_check_id'], 'value'),
@@ -230,32 +263,22 @@ def update_iso_table(database, sample_tb_rows, prev_iso_tb_rows):
     [
         State(app_id_dict['iso_div_id'], 'style'),
     ])
-def show_hide_iso_table(iso_changed, style):
-    if len(iso_changed) == 1:
-        style['display'] = 'block'
-    else:
-        style['display'] = 'none'
-    return style
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_output_div'),
     Output(app_id_dict['output_id'], 'style'),
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
         Input(app_id_dict['error_id'], 'children'),
     ])
-def show_output_div(n_submit, test_passed):
-    if n_submit is not None:
-        if test_passed is True:
-            return {'display': 'block'}
-        else:
-            return {'display': 'none'}
-    else:
-        return {'display': 'none'}
 
 
 @app.callback(
-    Output(app_id_dict['error_id'], 'children'),
+    [
+        Output(app_id_dict['error_id'], 'children'),
+        Output(app_id_dict['hidden_input_id'], 'children'),
+    ],
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
     ],
@@ -268,8 +291,10 @@ def show_output_div(n_submit, test_passed):
         State(app_id_dict['band_min_id'], 'value'),
         State(app_id_dict['band_max_id'], 'value'),
         State(app_id_dict['band_type_id'], 'value'),
+        State(app_id_dict['target_trans_id'], 'value'),
     ])
-def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed, beamline, band_min, band_max, band_type):
+def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed, beamline, band_min, band_max, band_type,
+          target_trans):
     if n_submit is not None:
         # Convert all number str to numeric and keep rest invalid input
         sample_tb_dict = force_dict_to_numeric(input_dict_list=sample_tb_rows)
@@ -282,6 +307,7 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed, beamline
         # Test density required or not
         if all(test_passed_list):
             test_passed_list, output_div_list = validate_density_input(sample_tb_df=sample_tb_df,
+                                                                       database=database,
                                                                        test_passed_list=test_passed_list,
                                                                        output_div_list=output_div_list)
         # Test iso input format and sum
@@ -305,6 +331,12 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed, beamline
                                                                           test_passed_list=test_passed_list,
                                                                           output_div_list=output_div_list)
 
+        # Test target transmission input
+        if all(test_passed_list):
+            test_passed_list, output_div_list = validate_target_trans_input(target_trans=target_trans,
+                                                                            test_passed_list=test_passed_list,
+                                                                            output_div_list=output_div_list)
+
         # Test energy range for bonded H cross-sections
         if all(test_passed_list):
             for each_chem in sample_tb_dict[chem_name]:
@@ -340,11 +372,12 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed, beamline
 
         # Return result
         if all(test_passed_list):
-            return True
+            return True, save_input_context(sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed,
+                                            database=database)
         else:
-            return output_div_list
+            return output_div_list, None
     else:
-        return None
+        return None, None
 
 
 @app.callback(
@@ -354,30 +387,58 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed, beamline
         Input(app_id_dict['error_id'], 'children'),
     ],
     [
-        State(app_id_dict['database_id'], 'value'),
-        State(app_id_dict['sample_table_id'], 'data'),
-        State(app_id_dict['iso_table_id'], 'data'),
-        State(app_id_dict['iso_check_id'], 'value'),
+        State(app_id_dict['hidden_input_id'], 'children'),
         State(app_id_dict['beamline_id'], 'value'),
         State(app_id_dict['band_min_id'], 'value'),
         State(app_id_dict['band_max_id'], 'value'),
         State(app_id_dict['band_type_id'], 'value'),
+        State(app_id_dict['target_trans_id'], 'value'),
     ])
-def output_transmission_and_stack(n_submit, test_passed, database, sample_tb_rows, iso_tb_rows, iso_changed,
-                                  beamline, band_min, band_max, band_type):
-    if test_passed is True:
-        output_div_list, o_stack = form_transmission_result_div(sample_tb_rows=sample_tb_rows,
-                                                                iso_tb_rows=iso_tb_rows,
+def output_transmission_and_stack(n_submit, test_passed, input_id, beamline, band_min, band_max, band_type,
+                                  target_trans):
+    if test_passed is not True:
+        return None
+    input_dict = load_input_context(input_id=input_id)
+    sample_tb_df = input_dict['sample_tb_df']
+    iso_tb_df = input_dict['iso_tb_df']
+    iso_changed = input_dict['iso_changed']
+    database = input_dict['database']
+    if beamline == 'all':
+        output_div_list, o_stack = form_transmission_comparison_div(sample_tb_df=sample_tb_df,
+                                                                    iso_tb_df=iso_tb_df,
+                                                                    iso_changed=iso_changed,
+                                                                    band_min=band_min,
+                                                                    band_max=band_max,
+                                                                    band_type=band_type,
+                                                                    database=database)
+        if target_trans is not None:
+            output_div_list.extend(form_thickness_solution_div(sample_tb_df=sample_tb_df,
+                                                               iso_tb_df=iso_tb_df,
+                                                               iso_changed=iso_changed,
+                                                               beamline='all',
+                                                               band_min=band_min,
+                                                               band_max=band_max,
+                                                               band_type=band_type,
+                                                               database=database,
+                                                               target_trans=target_trans))
+        if o_stack is not None:
+            sample_stack_div_list = form_sample_stack_table_div(o_stack=o_stack)
+            output_div_list.extend(sample_stack_div_list)
+        return output_div_list
+    else:
+        output_div_list, o_stack = form_transmission_result_div(sample_tb_df=sample_tb_df,
+                                                                iso_tb_df=iso_tb_df,
                                                                 iso_changed=iso_changed,
                                                                 beamline=beamline,
                                                                 band_min=band_min,
                                                                 band_max=band_max,
                                                                 band_type=band_type,
-                                                                database=database)
+                                                                database=database,
+                                                                grid=get_transmission_grid(beamline=beamline))
         if beamline != 'imaging':  # add CG-1D anyway if not selected
             try:
-                trans_div_list_tof, o_stack_cg1d = form_transmission_result_div(sample_tb_rows=sample_tb_rows,
-                                                                                iso_tb_rows=iso_tb_rows,
+                trans_div_list_tof, o_stack_cg1d = form_transmission_result_div(sample_tb_df=sample_tb_df,
+                                                                                iso_tb_df=iso_tb_df,
                                                                                 iso_changed=iso_changed,
                                                                                 beamline='imaging',
                                                                                 band_min=band_min,
@@ -388,10 +449,21 @@ def output_transmission_and_stack(n_submit, test_passed, database, sample_tb_row
             except Exception:
                 pass
 
+        # Thickness for the target transmission
+        if target_trans is not None:
+            output_div_list.extend(form_thickness_solution_div(sample_tb_df=sample_tb_df,
+                                                               iso_tb_df=iso_tb_df,
+                                                               iso_changed=iso_changed,
+                                                               beamline=beamline,
+                                                               band_min=band_min,
+                                                               band_max=band_max,
+                                                               band_type=band_type,
+                                                               database=database,
+                                                               target_trans=target_trans,
+                                                               grid=get_transmission_grid(beamline=beamline)))
+
         # Sample stack table div
         sample_stack_div_list = form_sample_stack_table_div(o_stack=o_stack)
         output_div_list.extend(sample_stack_div_list)
 
         return output_div_list
-    else:
-        return None
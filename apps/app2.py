@@ -1,7 +1,7 @@
-from dash.dependencies import Input, Output, State
+import dash
+import flask
+from dash.dependencies import Input, Output, State, ClientsideFunction
 from _app import app
-import plotly.tools as tls
-import matplotlib.pyplot as plt
 from _utilities import *
 
 # Neutron resonance tool
@@ -163,11 +163,23 @@ layout = html.Div(
         # Error message div
         html.Div(id=app_id_dict['error_id'], children=None),
 
-        # Hidden div to store json
-        html.Div(id=app_id_dict['hidden_df_json_id'], style={'display': 'none'}),
+        # Id of the validated input
+        html.Div(id=app_id_dict['hidden_input_id'], style={'display': 'none'}),
 
-        # Hidden div to store x_type
-        html.Div(id=app_id_dict['prev_x_type_id'], children='energy', style={'display': 'none'}),
+        # Fires 'iso_update_delay_ms' after the last edit of the sample table, to update the isotope table
+        dcc.Interval(id=app_id_dict['iso_update_interval_id'], interval=iso_update_delay_ms, max_intervals=0),
+        # Key of the sample table the isotope table was last formed from
+        dcc.Store(id=app_id_dict['iso_update_key_id']),
+
+        # Hidden div to store the result id (or the encoded result)
+        html.Div(id=app_id_dict['hidden_result_id'], style={'display': 'none'}),
+
+        # Hidden div to store the id of the running calculation, polled by the interval
+        html.Div(id=app_id_dict['hidden_job_id'], style={'display': 'none'}),
+        dcc.Interval(id=app_id_dict['job_interval_id'], interval=reso_job_poll_ms, disabled=True),
+
+        # Store of the plotted figure, with energies as x
+        dcc.Store(id=app_id_dict['plot_fig_store_id']),
 
         # Output div
         html.Div(
@@ -175,6 +187,9 @@ layout = html.Div(
                 # Plot options
                 html.Div(id=app_id_dict['plot_options_div_id'], children=plot_option_div),
 
+                # Progress of the calculation
+                html.Div(id=app_id_dict['job_progress_id']),
+
                 # Plot
                 html.Div(id=app_id_dict['plot_div_id'], children=plot_loading, className='container'),
 
@@ -182,7 +197,7 @@ layout = html.Div(
                 html.Div(
                     [
                         html.Button(
-                            'Display data table',
+                            'Export plot data',
                             id=app_id_dict['export_plot_data_button_id'],
                             style={'display': 'inline-block'},
                             n_clicks_timestamp=0
@@ -287,23 +302,45 @@ def update_rows(n_add, n_del, list_of_contents, upload_time, prev_upload_time, l
     return rows, error_message, upload_t
 
 
-@app.callback(
-    Output(app_id_dict['iso_table_id'], 'data'),
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='schedule_iso_update'),
+    [
+        Output(app_id_dict['iso_update_interval_id'], 'interval'),
+        Output(app_id_dict['iso_update_interval_id'], 'max_intervals'),
+    ],
     [
         Input(app_id_dict['database_id'], 'value'),
         Input(app_id_dict['sample_table_id'], 'data'),
     ],
     [
-        State(app_id_dict['iso_table_id'], 'data'),
+        State(app_id_dict['iso_update_interval_id'], 'interval'),
+        State(app_id_dict['iso_update_interval_id'], 'n_intervals'),
     ])
-def update_iso_table(database, sample_tb_rows, prev_iso_tb_rows):
-    return_dict = update_iso_table_callback(sample_tb_rows=sample_tb_rows,
-                                            prev_iso_tb_rows=prev_iso_tb_rows,
-                                            database=database)
-    return return_dict
 
 
 @app.callback(
+    [
+        Output(app_id_dict['iso_table_id'], 'data'),
+        Output(app_id_dict['iso_update_key_id'], 'data'),
+    ],
+    [
+        Input(app_id_dict['iso_update_interval_id'], 'n_intervals'),
+    ],
+    [
+        State(app_id_dict['database_id'], 'value'),
+        State(app_id_dict['sample_table_id'], 'data'),
+        State(app_id_dict['iso_table_id'], 'data'),
+        State(app_id_dict['iso_update_key_id'], 'data'),
+    ])
+def update_iso_table(n_intervals, database, sample_tb_rows, prev_iso_tb_rows, prev_update_key):
+    return update_iso_table_callback(sample_tb_rows=sample_tb_rows,
+                                     prev_iso_tb_rows=prev_iso_tb_rows,
+                                     database=database,
+                                     prev_update_key=prev_update_key)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_hide_iso_table'),
     Output(app_id_dict['iso_div_id'], 'style'),
     [
         Input(app_id_dict['iso_check_id'], 'value'),
@@ -311,84 +348,38 @@ def update_iso_table(database, sample_tb_rows, prev_iso_tb_rows):
     [
         State(app_id_dict['iso_div_id'], 'style'),
     ])
-def show_hide_iso_table(iso_changed, style):
-    if len(iso_changed) == 1:
-        style['display'] = 'block'
-    else:
-        style['display'] = 'none'
-    return style
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='disable_show_options'),
     Output('show_opt', 'options'),
     [
         Input('y_type', 'value'),
     ])
-def disable_show_options(y_type):
-    if y_type in ['attenuation', 'transmission']:
-        options = [
-            {'label': 'Total', 'value': 'total'},
-            {'label': 'Layer', 'value': 'layer'},
-            {'label': 'Element', 'value': 'ele'},
-            {'label': 'Isotope', 'value': 'iso'},
-        ]
-    elif y_type == 'mu_per_cm':
-        options = [
-            {'label': 'Layer', 'value': 'layer'},
-            {'label': 'Element', 'value': 'ele'},
-            {'label': 'Isotope', 'value': 'iso'},
-        ]
-    elif y_type[-3:] == 'raw':
-        options = [
-            {'label': 'Isotope', 'value': 'iso'},
-        ]
-    else:
-        options = [
-            {'label': 'Element', 'value': 'ele'},
-            {'label': 'Isotope', 'value': 'iso'},
-        ]
-    return options
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='disable_plot_scale_options'),
     Output('plot_scale', 'options'),
     [
         Input('y_type', 'value'),
     ])
-def disable_plot_scale_options(y_type):
-    if y_type in ['attenuation', 'transmission']:
-        options = [
-            {'label': 'Linear', 'value': 'linear'},
-            {'label': 'Log x', 'value': 'logx'},
-        ]
-    else:
-        options = [
-            {'label': 'Linear', 'value': 'linear'},
-            {'label': 'Log x', 'value': 'logx'},
-            {'label': 'Log y', 'value': 'logy'},
-            {'label': 'Loglog', 'value': 'loglog'},
-        ]
-    return options
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_output_div'),
     Output(app_id_dict['output_id'], 'style'),
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
         Input(app_id_dict['error_id'], 'children'),
     ])
-def show_output_div(n_submit, test_passed):
-    if n_submit is not None:
-        if test_passed is True:
-            return {'display': 'block'}
-        else:
-            return {'display': 'none'}
-    else:
-        return {'display': 'none'}
 
 
 @app.callback(
-    Output(app_id_dict['error_id'], 'children'),
+    [
+        Output(app_id_dict['error_id'], 'children'),
+        Output(app_id_dict['hidden_input_id'], 'children'),
+    ],
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
     ],
@@ -412,6 +403,7 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, range_tb_rows, iso_ch
         # Test density required or not
         if all(test_passed_list):
             test_passed_list, output_div_list = validate_density_input(sample_tb_df=sample_tb_df,
+                                                                       database=database,
                                                                        test_passed_list=test_passed_list,
                                                                        output_div_list=output_div_list)
         # Test iso input format and sum
@@ -455,210 +447,181 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, range_tb_rows, iso_ch
 
         # Return result
         if all(test_passed_list):
-            return True
+            return True, save_input_context(sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed,
+                                            database=database)
         else:
-            return output_div_list
+            return output_div_list, None
     else:
-        return None
+        return None, None
 
 
 @app.callback(
-    Output(app_id_dict['prev_x_type_id'], 'children'),
     [
-        Input('x_type', 'value'),
-    ])
-def store_x_type(x_type):
-    return x_type
-
-
-@app.callback(
-    Output(app_id_dict['hidden_df_json_id'], 'children'),
+        Output(app_id_dict['hidden_result_id'], 'children'),
+        Output(app_id_dict['hidden_job_id'], 'children'),
+        Output(app_id_dict['job_progress_id'], 'children'),
+        Output(app_id_dict['job_interval_id'], 'disabled'),
+    ],
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
         Input(app_id_dict['error_id'], 'children'),
-        Input('y_type', 'value'),
+        Input(app_id_dict['job_interval_id'], 'n_intervals'),
     ],
     [
         State(app_id_dict['range_table_id'], 'data'),
         State(app_id_dict['e_step_id'], 'value'),
         State(app_id_dict['distance_id'], 'value'),
-        State(app_id_dict['sample_table_id'], 'data'),
-        State(app_id_dict['iso_table_id'], 'data'),
-        State(app_id_dict['iso_check_id'], 'value'),
-        State(app_id_dict['database_id'], 'value'),
+        State(app_id_dict['hidden_input_id'], 'children'),
+        State(app_id_dict['hidden_job_id'], 'children'),
     ])
-def store_reso_df_in_json(n_submit,
-                          test_passed,
-                          y_type,
-                          range_tb_rows, e_step, distance_m,
-                          sample_tb_rows, iso_tb_rows,
-                          iso_changed, database):
+def store_reso_result(n_submit,
+                      test_passed,
+                      n_intervals,
+                      range_tb_rows, e_step, distance_m,
+                      input_id,
+                      job_id):
+    triggered_list = [each['prop_id'] for each in dash.callback_context.triggered]
+
+    # Polling of the running job
+    if triggered_list == [app_id_dict['job_interval_id'] + '.n_intervals']:
+        if job_id is None:
+            raise PreventUpdate
+        job_state = get_reso_job_state(job_id=job_id)
+        if job_state is not None and job_state['status'] in ['queued', 'running']:
+            return dash.no_update, dash.no_update, form_reso_job_div(state=job_state), False
+        if job_state is not None and job_state['status'] == 'done':
+            return job_state['result_id'], None, None, True
+        if job_state is not None and job_state['status'] == 'cancelled':
+            return None, None, None, True
+        return None, None, form_reso_job_div(state=job_state), True
+
+    # A new calculation replaces the running one
+    if job_id is not None:
+        cancel_reso_job(job_id=job_id)
     if test_passed is True:
-        # Modify input for testing
-        sample_tb_dict = force_dict_to_numeric(input_dict_list=sample_tb_rows)
-        iso_tb_dict = force_dict_to_numeric(input_dict_list=iso_tb_rows)
-        sample_tb_df = pd.DataFrame(sample_tb_dict)
-        if len(iso_changed) == 1:
-            iso_tb_df = pd.DataFrame(iso_tb_dict)
-        else:
-            iso_tb_df = form_iso_table(sample_df=sample_tb_df, database=database)
-
         # Calculation starts
-        range_tb_df = pd.DataFrame(range_tb_rows)
-        o_reso = init_reso_from_tb(range_tb_df=range_tb_df, e_step=e_step, database=database)
-        o_reso = unpack_sample_tb_df_and_add_layer(o_reso=o_reso, sample_tb_df=sample_tb_df)
-        o_reso = unpack_iso_tb_df_and_update(o_reso=o_reso, iso_tb_df=iso_tb_df, iso_changed=iso_changed)
-
-        # Get dfs from o_reso stacks
-        df_y = o_reso.export(y_axis=y_type,
-                             x_axis='energy',
-                             time_unit='us',
-                             mixed=True,
-                             all_layers=True,
-                             all_elements=True,
-                             all_isotopes=True,
-                             source_to_detector_m=distance_m,
-                             output_type='df')
-
-        df_x = pd.DataFrame()
-        df_x[energy_name] = df_y[energy_name][:]
-        df_x = fill_df_x_types(df=df_x, distance_m=distance_m)
-
-        df_y.drop(columns=[df_y.columns[0]], inplace=True)  # Drop x-axis row
-
-        datasets = {
-            'x': df_x.to_json(orient='split', date_format='iso'),
-            'y': df_y.to_json(orient='split', date_format='iso'),
-        }
-        return json.dumps(datasets)
+        input_dict = load_input_context(input_id=input_id)
+        v_1 = range_tb_rows[0][energy_name]
+        v_2 = range_tb_rows[1][energy_name]
+        params = dict(e_min=min(v_1, v_2), e_max=max(v_1, v_2), database=input_dict['database'],
+                      sample_tb_dict=input_dict['sample_tb_df'].to_dict('list'),
+                      iso_tb_dict=input_dict['iso_tb_df'].to_dict('list'),
+                      iso_changed=input_dict['iso_changed'], distance_m=distance_m)
+        # Too many points: a coarse preview first, zoomed windows are refined at 'e_step'
+        preview_e_step = get_progressive_e_step(e_min=params['e_min'], e_max=params['e_max'], e_step=e_step)
+        meta = {'progressive': preview_e_step != e_step, 'e_step': e_step, 'preview_e_step': preview_e_step,
+                'params': params}
+        if not result_store_enabled:
+            # No shared disk for the job state, computed here
+            df_dict, stack_list = calculate_reso_sigma(e_step=preview_e_step, **params)
+            return dump_reso_result(df_dict=df_dict, stack_list=stack_list, meta=meta), None, None, True
+
+        # The raw cross-sections are stored once, every y type and level is derived from them when shown
+        result_key = get_reso_result_key(params=params, e_step=preview_e_step)
+        if has_result(result_key):
+            return result_key, None, None, True
+        new_job_id = submit_reso_job(result_key=result_key, params=params, e_step=preview_e_step, meta=meta)
+        return None, new_job_id, form_reso_job_div(state=get_reso_job_state(job_id=new_job_id)), False
     else:
-        return None
+        return None, None, None, True
 
 
 @app.callback(
-    Output(app_id_dict['plot_div_id'], 'children'),
+    [
+        Output(app_id_dict['plot_div_id'], 'children'),
+        Output(app_id_dict['plot_fig_store_id'], 'data'),
+    ],
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
         Input(app_id_dict['error_id'], 'children'),
         Input('show_opt', 'value'),
-        Input(app_id_dict['hidden_df_json_id'], 'children'),
+        Input(app_id_dict['hidden_result_id'], 'children'),
         Input('y_type', 'value'),
     ],
     [
-        State('x_type', 'value'),
         State('show_opt', 'value'),
-        State('plot_scale', 'value'),
     ])
-def plot(n_submit, test_passed, show_opt, jsonified_data, y_type, x_type, prev_show_opt, plot_scale):
-    if test_passed is True:
-        # Load and shape the data
-        df_x, df_y, to_plot_list, x_tag, y_label = shape_reso_df_to_output(x_type=x_type,
+def plot(n_submit, test_passed, show_opt, result_data, y_type, prev_show_opt):
+    if test_passed is True and result_data is not None:
+        # Load and shape the data, the figure is kept with energies as x
+        df_x, df_y, to_plot_list, x_tag, y_label = shape_reso_df_to_output(x_type='energy',
                                                                            y_type=y_type,
                                                                            show_opt=show_opt,
-                                                                           jsonified_data=jsonified_data,
+                                                                           result_data=result_data,
                                                                            prev_show_opt=prev_show_opt,
                                                                            to_csv=False)
         df_to_plot = df_y[to_plot_list]
         df_to_plot.insert(loc=0, column=x_tag, value=df_x[x_tag])
 
-        fig = plt.figure()
-        ax1 = fig.add_subplot(111)
-
-        # Plot
-        try:
-            ax1 = df_to_plot.set_index(keys=x_tag).plot(legend=False, ax=ax1)
-        except TypeError:
-            pass
-        ax1.set_ylabel(y_label)
-
-        plotly_fig = tls.mpl_to_plotly(fig)
-
-        # Layout
-        plotly_fig.layout.showlegend = True
-        plotly_fig.layout.autosize = True
-        plotly_fig.layout.height = 600
-        plotly_fig.layout.width = 900
-        plotly_fig.layout.margin = {'b': 52, 'l': 80, 'pad': 0, 'r': 15, 't': 15}
-        plotly_fig.layout.xaxis1.tickfont.size = 15
-        plotly_fig.layout.xaxis1.titlefont.size = 18
-        plotly_fig.layout.yaxis1.tickfont.size = 15
-        plotly_fig.layout.yaxis1.titlefont.size = 18
-        plotly_fig.layout.xaxis.autorange = True
-        if y_type in ['attenuation', 'transmission']:
-            plotly_fig['layout']['yaxis']['autorange'] = False
-            if plot_scale in ['logy', 'loglog']:
-                plot_scale = 'linear'
-        else:
-            plotly_fig['layout']['yaxis']['autorange'] = True
-
-        if plot_scale == 'logx':
-            plotly_fig['layout']['xaxis']['type'] = 'log'
-            plotly_fig['layout']['yaxis']['type'] = 'linear'
-            plotly_fig['layout']['yaxis']['range'] = [-0.05, 1.05]
-        elif plot_scale == 'logy':
-            if y_type not in ['attenuation', 'transmission']:
-                plotly_fig['layout']['xaxis']['type'] = 'linear'
-                plotly_fig['layout']['yaxis']['type'] = 'log'
-        elif plot_scale == 'loglog':
-            if y_type not in ['attenuation', 'transmission']:
-                plotly_fig['layout']['xaxis']['type'] = 'log'
-                plotly_fig['layout']['yaxis']['type'] = 'log'
-        else:
-            plotly_fig['layout']['xaxis']['type'] = 'linear'
-            plotly_fig['layout']['yaxis']['type'] = 'linear'
-            plotly_fig['layout']['yaxis']['range'] = [-0.05, 1.05]
+        meta = load_result_meta(result_data=result_data)
+        plotly_fig = build_plotly_fig(df=df_to_plot, x_col=x_tag, y_label=y_label, max_points=plot_max_points)
+        plotly_fig = set_progressive_note(plotly_fig=plotly_fig, meta=meta)
+        plotly_fig = set_reso_fig_meta(plotly_fig=plotly_fig, distance_m=meta['params']['distance_m'])
 
-        return html.Div([dcc.Graph(figure=plotly_fig, id=app_id_dict['plot_fig_id'])])
+        return html.Div([dcc.Graph(id=app_id_dict['plot_fig_id'])]), plotly_fig.to_dict()
     else:
-        return plot_loading
+        return plot_loading, None
 
 
-@app.callback(
+# Shows the stored figure in the selected x type and scale, switching these never goes back to the server
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='render_reso_fig'),
     Output(app_id_dict['plot_fig_id'], 'figure'),
     [
-        Input('plot_scale', 'value'),
+        Input(app_id_dict['plot_fig_store_id'], 'data'),
         Input('x_type', 'value'),
+        Input('plot_scale', 'value'),
     ],
     [
         State('y_type', 'value'),
-        State(app_id_dict['prev_x_type_id'], 'children'),
-        State(app_id_dict['plot_fig_id'], 'figure'),
-        State(app_id_dict['hidden_df_json_id'], 'children'),
     ])
-def set_plot_scale_log_or_linear(plot_scale, x_type, y_type, prev_x_type, plotly_fig, jsonified_data):
-    # Change plot x type
-    if x_type != prev_x_type:
-        df_dict = load_dfs(jsonified_data=jsonified_data)
-        x_tag = x_type_to_x_tag(x_type=x_type)
-        for each_trace in plotly_fig['data']:
-            each_trace['x'] = df_dict['x'][x_tag]
-        plotly_fig['layout']['xaxis']['title']['text'] = x_tag
-
-    if y_type in ['attenuation', 'transmission']:
-        plotly_fig['layout']['yaxis']['autorange'] = False
-        if plot_scale in ['logy', 'loglog']:
-            plot_scale = 'linear'
-    else:
-        plotly_fig['layout']['yaxis']['autorange'] = True
-
-    # Change plot scale between log and linear
-    if plot_scale == 'logx':
-        plotly_fig['layout']['xaxis']['type'] = 'log'
-        plotly_fig['layout']['yaxis']['type'] = 'linear'
-        plotly_fig['layout']['yaxis']['range'] = [-0.05, 1.05]
-    elif plot_scale == 'logy':
-        if y_type not in ['attenuation', 'transmission']:
-            plotly_fig['layout']['xaxis']['type'] = 'linear'
-            plotly_fig['layout']['yaxis']['type'] = 'log'
-    elif plot_scale == 'loglog':
-        if y_type not in ['attenuation', 'transmission']:
-            plotly_fig['layout']['xaxis']['type'] = 'log'
-            plotly_fig['layout']['yaxis']['type'] = 'log'
-    else:
-        plotly_fig['layout']['xaxis']['type'] = 'linear'
-        plotly_fig['layout']['yaxis']['type'] = 'linear'
-        plotly_fig['layout']['yaxis']['range'] = [-0.05, 1.05]
 
+
+@app.callback(
+    Output(app_id_dict['plot_fig_store_id'], 'data'),
+    [
+        Input(app_id_dict['plot_fig_id'], 'relayoutData'),
+    ],
+    [
+        State('plot_scale', 'value'),
+        State('y_type', 'value'),
+        State('x_type', 'value'),
+        State('show_opt', 'value'),
+        State(app_id_dict['plot_fig_store_id'], 'data'),
+        State(app_id_dict['hidden_result_id'], 'children'),
+    ])
+def zoom_plot(relayout_data, plot_scale, y_type, x_type, show_opt, plotly_fig, result_data):
+    if plotly_fig is None:
+        raise PreventUpdate
+    x_axis_type, y_axis_type = get_plot_axis_types(plot_scale=plot_scale, y_type=y_type)
+    distance_m = plotly_fig['layout']['meta']['distance_m']
+
+    # Zoom: full resolution within the visible x window only
+    x_window = get_x_window(relayout_data=relayout_data, x_axis_type=x_axis_type)
+    if x_window is False:
+        raise PreventUpdate
+    if x_window is not None:
+        x_window = x_window_to_energy(x_window=x_window, x_type=x_type, distance_m=distance_m)
+    level_list = get_reso_level_list(y_type=y_type, show_opt=show_opt)
+    df_dict = load_reso_dfs(result_data=result_data, y_type=y_type, level_list=level_list)
+    meta = load_result_meta(result_data=result_data)
+    window_e_step = None
+    if meta.get('progressive') and x_window is not None:
+        # Recalculate the zoomed window only, at the fine energy step
+        window_df_dict = calculate_reso_dfs_in_window(meta=meta, df_x=df_dict['x'], x_tag=energy_name,
+                                                      x_window=x_window, y_type=y_type, level_list=level_list)
+        if window_df_dict is not None:
+            df_dict = window_df_dict
+            window_e_step = float(np.diff(df_dict['x'][energy_name].to_numpy()[:2])[0])
+    plotly_fig = refresh_fig_traces(plotly_fig=plotly_fig, df_x=df_dict['x'], df_y=df_dict['y'],
+                                    x_tag=energy_name, x_window=x_window)
+    plotly_fig = set_progressive_note(plotly_fig=plotly_fig, meta=meta, window_e_step=window_e_step)
+    y_window = None
+    if 'yaxis.range[0]' in relayout_data and 'yaxis.range[1]' in relayout_data:
+        y_window = {'range': [relayout_data['yaxis.range[0]'], relayout_data['yaxis.range[1]']],
+                    'axis_type': y_axis_type}
+    plotly_fig = set_reso_fig_meta(plotly_fig=plotly_fig, distance_m=distance_m, x_window=x_window,
+                                   y_window=y_window)
     return plotly_fig
 
 
@@ -669,29 +632,26 @@ def set_plot_scale_log_or_linear(plot_scale, x_type, y_type, prev_x_type, plotly
         Input(app_id_dict['error_id'], 'children'),
     ],
     [
-        State(app_id_dict['database_id'], 'value'),
-        State(app_id_dict['sample_table_id'], 'data'),
-        State(app_id_dict['iso_table_id'], 'data'),
-        State(app_id_dict['iso_check_id'], 'value'),
+        State(app_id_dict['hidden_input_id'], 'children'),
         State(app_id_dict['range_table_id'], 'data'),
     ])
-def output_transmission_and_stack(n_submit, test_passed, database,
-                                  sample_tb_rows, iso_tb_rows, iso_changed, range_table_rows):
+def output_transmission_and_stack(n_submit, test_passed, input_id, range_table_rows):
     if test_passed is True:
+        input_dict = load_input_context(input_id=input_id)
         if range_table_rows[0][energy_name] < range_table_rows[1][energy_name]:
             e_min = range_table_rows[0][energy_name]
             e_max = range_table_rows[1][energy_name]
         else:
             e_min = range_table_rows[1][energy_name]
             e_max = range_table_rows[0][energy_name]
-        output_div_list, o_stack = form_transmission_result_div(sample_tb_rows=sample_tb_rows,
-                                                                iso_tb_rows=iso_tb_rows,
-                                                                iso_changed=iso_changed,
+        output_div_list, o_stack = form_transmission_result_div(sample_tb_df=input_dict['sample_tb_df'],
+                                                                iso_tb_df=input_dict['iso_tb_df'],
+                                                                iso_changed=input_dict['iso_changed'],
                                                                 beamline='snap',
                                                                 band_min=e_min,
                                                                 band_max=e_max,
                                                                 band_type='energy',
-                                                                database=database)
+                                                                database=input_dict['database'])
         # trans_div_list_tof, o_stack_cg1d = form_transmission_result_div(sample_tb_rows=sample_tb_rows,
         #                                                                 iso_tb_rows=iso_tb_rows,
         #                                                                 iso_changed=iso_changed,
@@ -724,19 +684,44 @@ def output_transmission_and_stack(n_submit, test_passed, database,
         State('y_type', 'value'),
         State('show_opt', 'value'),
         State(app_id_dict['error_id'], 'children'),
-        State(app_id_dict['hidden_df_json_id'], 'children'),
+        State(app_id_dict['hidden_result_id'], 'children'),
     ])
-def export_plot_data(n_submit, n_export, x_type, y_type, show_opt, test_passed, jsonified_data):
+def export_plot_data(n_submit, n_export, x_type, y_type, show_opt, test_passed, result_data):
     if n_export != 0:
         if n_export > n_submit:
             if test_passed is True:
+                if result_store_enabled and not has_result(result_id=result_data):
+                    return html.P('The result is still being calculated, please export it once plotted.'), None
+                nbr_points = get_reso_export_nbr_points(result_data=result_data)
+                if nbr_points > progressive_export_max_points:
+                    return html.P('Too many points to export ({}), please increase the energy step to export at '
+                                  'most {} points.'.format(nbr_points, progressive_export_max_points)), None
+                if result_store_enabled:
+                    # Streamed from the stored result by 'export_plot_data_csv', at the requested energy step
+                    df_tb_div_list = [
+                        html.Hr(),
+                        html.A('Download plot data (.csv)',
+                               href=app.get_relative_path('/' + get_reso_export_url(result_id=result_data,
+                                                                                    x_type=x_type, y_type=y_type,
+                                                                                    show_opt=show_opt)),
+                               download=plot_data_filename),
+                    ]
+                    return df_tb_div_list, '\u2705'
+                # Exported data are always at the requested energy step
+                meta = load_result_meta(result_data=result_data)
+                df_dict = None
+                if meta.get('progressive'):
+                    df_dict = calculate_reso_dfs(e_step=meta['e_step'], y_type=y_type,
+                                                 level_list=get_reso_level_list(y_type=y_type, show_opt=show_opt),
+                                                 use_cache=False, **meta['params'])
                 # Load and shape the data
                 df_x, df_y, to_export_list, x_tag, y_label = shape_reso_df_to_output(x_type=x_type,
                                                                                      y_type=y_type,
                                                                                      show_opt=show_opt,
-                                                                                     jsonified_data=jsonified_data,
+                                                                                     result_data=result_data,
                                                                                      prev_show_opt=None,
-                                                                                     to_csv=True)
+                                                                                     to_csv=True,
+                                                                                     df_dict=df_dict)
                 df_to_export = df_y[to_export_list]
                 x_tag = x_type_to_x_tag(x_type)
                 df_to_export.insert(loc=0, column=x_tag, value=df_x[x_tag])
@@ -745,6 +730,7 @@ def export_plot_data(n_submit, n_export, x_type, y_type, show_opt, test_passed,
                 # df_to_export.insert(loc=0, column=energy_name, value=df_x[energy_name])
 
                 # df_to_export.to_clipboard(index=False, excel=True)  # Does not work on the Heroku server
+                # Results kept by the browser (see 'dump_dfs') are not on the server to be streamed
                 df_tb_div_list = [
                     html.Hr(),
                     dt.DataTable(
@@ -767,3 +753,19 @@ def export_plot_data(n_submit, n_export, x_type, y_type, show_opt, test_passed,
             return None, None
     else:
         return None, None
+
+
+@app.server.route(app.config.routes_pathname_prefix + reso_export_path.format('<result_id>'))
+def export_plot_data_csv(result_id):
+    x_type = flask.request.args.get('x_type', 'energy')
+    y_type = flask.request.args.get('y_type', 'transmission')
+    if not has_result(result_id=result_id) or x_type not in x_type_list or y_type not in y_type_list:
+        flask.abort(404)
+    if get_reso_export_nbr_points(result_data=result_id) > progressive_export_max_points:
+        flask.abort(413)
+    csv_chunks = iter_reso_csv(result_id=result_id,
+                               x_type=x_type,
+                               y_type=y_type,
+                               show_opt=flask.request.args.getlist('show_opt'))
+    return flask.Response(flask.stream_with_context(csv_chunks), mimetype='text/csv',
+                          headers={'Content-Disposition': 'attachment; filename=' + plot_data_filename})
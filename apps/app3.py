@@ -1,4 +1,4 @@
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 
 from _app import app
 from _utilities import *
@@ -70,6 +70,14 @@ layout = html.Div(
         # Error message div
         html.Div(id=app_id_dict['error_id'], children=None),
 
+        # Id of the validated input
+        html.Div(id=app_id_dict['hidden_input_id'], style={'display': 'none'}),
+
+        # Fires 'iso_update_delay_ms' after the last edit of the sample table, to update the isotope table
+        dcc.Interval(id=app_id_dict['iso_update_interval_id'], interval=iso_update_delay_ms, max_intervals=0),
+        # Key of the sample table the isotope table was last formed from
+        dcc.Store(id=app_id_dict['iso_update_key_id']),
+
         # Output div
         html.Div(
             [
@@ -129,23 +137,45 @@ def update_rows(n_add, n_del, list_of_contents, upload_time, prev_upload_time, l
     return rows, error_message, upload_t
 
 
-@app.callback(
-    Output(app_id_dict['iso_table_id'], 'data'),
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='schedule_iso_update'),
+    [
+        Output(app_id_dict['iso_update_interval_id'], 'interval'),
+        Output(app_id_dict['iso_update_interval_id'], 'max_intervals'),
+    ],
     [
         Input(app_id_dict['database_id'], 'value'),
         Input(app_id_dict['sample_table_id'], 'data'),
     ],
     [
-        State(app_id_dict['iso_table_id'], 'data'),
+        State(app_id_dict['iso_update_interval_id'], 'interval'),
+        State(app_id_dict['iso_update_interval_id'], 'n_intervals'),
     ])
-def update_iso_table(database, sample_tb_rows, prev_iso_tb_rows):
-    return_dict = update_iso_table_callback(sample_tb_rows=sample_tb_rows,
-                                            prev_iso_tb_rows=prev_iso_tb_rows,
-                                            database=database)
-    return return_dict
 
 
 @app.callback(
+    [
+        Output(app_id_dict['iso_table_id'], 'data'),
+        Output(app_id_dict['iso_update_key_id'], 'data'),
+    ],
+    [
+        Input(app_id_dict['iso_update_interval_id'], 'n_intervals'),
+    ],
+    [
+        State(app_id_dict['database_id'], 'value'),
+        State(app_id_dict['sample_table_id'], 'data'),
+        State(app_id_dict['iso_table_id'], 'data'),
+        State(app_id_dict['iso_update_key_id'], 'data'),
+    ])
+def update_iso_table(n_intervals, database, sample_tb_rows, prev_iso_tb_rows, prev_update_key):
+    return update_iso_table_callback(sample_tb_rows=sample_tb_rows,
+                                     prev_iso_tb_rows=prev_iso_tb_rows,
+                                     database=database,
+                                     prev_update_key=prev_update_key)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_hide_iso_table'),
     Output(app_id_dict['iso_div_id'], 'style'),
     [
         Input(app_id_dict['iso_check_id'], 'value'),
@@ -153,32 +183,22 @@ def update_iso_table(database, sample_tb_rows, prev_iso_tb_rows):
     [
         State(app_id_dict['iso_div_id'], 'style'),
     ])
-def show_hide_iso_table(iso_changed, style):
-    if len(iso_changed) == 1:
-        style['display'] = 'block'
-    else:
-        style['display'] = 'none'
-    return style
 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='neuit', function_name='show_output_div'),
     Output(app_id_dict['output_id'], 'style'),
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
         Input(app_id_dict['error_id'], 'children'),
     ])
-def show_output_div(n_submit, test_passed):
-    if n_submit is not None:
-        if test_passed is True:
-            return {'display': 'block'}
-        else:
-            return {'display': 'none'}
-    else:
-        return {'display': 'none'}
 
 
 @app.callback(
-    Output(app_id_dict['error_id'], 'children'),
+    [
+        Output(app_id_dict['error_id'], 'children'),
+        Output(app_id_dict['hidden_input_id'], 'children'),
+    ],
     [
         Input(app_id_dict['submit_button_id'], 'n_clicks'),
     ],
@@ -215,11 +235,12 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed):
 
         # Return result
         if all(test_passed_list):
-            return True
+            return True, save_input_context(sample_tb_df=sample_tb_df, iso_tb_df=iso_tb_df, iso_changed=iso_changed,
+                                            database=database)
         else:
-            return output_div_list
+            return output_div_list, None
     else:
-        return None
+        return None, None
 
 
 @app.callback(
@@ -229,22 +250,15 @@ def error(n_submit, database, sample_tb_rows, iso_tb_rows, iso_changed):
         Input(app_id_dict['error_id'], 'children'),
     ],
     [
-        State(app_id_dict['database_id'], 'value'),
-        State(app_id_dict['sample_table_id'], 'data'),
-        State(app_id_dict['iso_table_id'], 'data'),
-        State(app_id_dict['iso_check_id'], 'value'),
+        State(app_id_dict['hidden_input_id'], 'children'),
         State(app_id_dict['compos_type_id'], 'value'),
     ])
-def output(n_submit, test_passed, database, compos_tb_rows, iso_tb_rows, iso_changed, compos_type):
+def output(n_submit, test_passed, input_id, compos_type):
     if test_passed is True:
-        # Modify input for testing
-        compos_tb_dict = force_dict_to_numeric(input_dict_list=compos_tb_rows)
-        iso_tb_dict = force_dict_to_numeric(input_dict_list=iso_tb_rows)
-        compos_tb_df = pd.DataFrame(compos_tb_dict)
-        if len(iso_changed) == 1:
-            iso_tb_df = pd.DataFrame(iso_tb_dict)
-        else:
-            iso_tb_df = form_iso_table(sample_df=compos_tb_df, database=database)
+        # Validated input
+        input_dict = load_input_context(input_id=input_id)
+        compos_tb_df = input_dict['sample_tb_df']
+        iso_tb_df = input_dict['iso_tb_df']
 
         # Calculation start
 
@@ -256,14 +270,14 @@ def output(n_submit, test_passed, database, compos_tb_rows, iso_tb_rows, iso_cha
         _iso_tb_df = iso_tb_df[:]
 
         # Calculation starts
-        transmission_div_list, o_stack = form_transmission_result_div(sample_tb_rows=_sample_df.to_dict('records'),
-                                                                      iso_tb_rows=_iso_tb_df.to_dict('records'),
-                                                                      iso_changed=iso_changed,
+        transmission_div_list, o_stack = form_transmission_result_div(sample_tb_df=_sample_df,
+                                                                      iso_tb_df=_iso_tb_df,
+                                                                      iso_changed=input_dict['iso_changed'],
                                                                       beamline='imaging_crop',
                                                                       band_min=None,
                                                                       band_max=None,
                                                                       band_type='energy',
-                                                                      database=database)
+                                                                      database=input_dict['database'])
         sample_stack_div_list = form_sample_stack_table_div(o_stack=o_stack, full_stack=False)
 
         compos_output_df, ele_list, mol_list = convert_input_to_composition(compos_df=_compos_df,
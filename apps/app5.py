@@ -2,8 +2,6 @@ from dash.dependencies import Input, Output, State
 
 from _app import app
 from _utilities import *
-import plotly.tools as tls
-import matplotlib.pyplot as plt
 # from bem.matter import Atom, Lattice, Structure
 # from bem import xscalc
 # from bem.matter import loadCif
@@ -245,44 +243,9 @@ def plot(cif_contents, x_type, y_type, plot_scale,
         x_label = x_type_to_x_label(x_type)
         y_label = y_type_to_y_label(y_type)
         output_style['display'] = 'block'
-        fig = plt.figure()
-        ax1 = fig.add_subplot(111)
-        # Plot
-        try:
-            ax1 = df_plot.set_index(keys='X').plot(legend=False, ax=ax1)
-        except TypeError:
-            pass
-        ax1.set_ylabel(y_label)
-        ax1.set_xlabel(x_label)
-        plotly_fig = tls.mpl_to_plotly(fig)
-
-        # Layout
-        plotly_fig.layout.showlegend = True
-        plotly_fig.layout.autosize = True
-        plotly_fig.layout.height = 600
-        plotly_fig.layout.width = 900
-        plotly_fig.layout.margin = {'b': 52, 'l': 80, 'pad': 0, 'r': 15, 't': 15}
-        plotly_fig.layout.xaxis1.tickfont.size = 15
-        plotly_fig.layout.xaxis1.titlefont.size = 18
-        plotly_fig.layout.yaxis1.tickfont.size = 15
-        plotly_fig.layout.yaxis1.titlefont.size = 18
-        plotly_fig.layout.xaxis.autorange = True
-        plotly_fig['layout']['yaxis']['autorange'] = True
-
-        if plot_scale == 'logx':
-            plotly_fig['layout']['xaxis']['type'] = 'log'
-            plotly_fig['layout']['yaxis']['type'] = 'linear'
-        elif plot_scale == 'logy':
-            if y_type not in ['attenuation', 'transmission']:
-                plotly_fig['layout']['xaxis']['type'] = 'linear'
-                plotly_fig['layout']['yaxis']['type'] = 'log'
-        elif plot_scale == 'loglog':
-            if y_type not in ['attenuation', 'transmission']:
-                plotly_fig['layout']['xaxis']['type'] = 'log'
-                plotly_fig['layout']['yaxis']['type'] = 'log'
-        else:
-            plotly_fig['layout']['xaxis']['type'] = 'linear'
-            plotly_fig['layout']['yaxis']['type'] = 'linear'
+        plotly_fig = build_plotly_fig(df=df_plot, x_col='X', y_label=y_label, x_label=x_label)
+        plotly_fig = set_plot_scale(plotly_fig=plotly_fig, plot_scale=plot_scale, y_type=y_type,
+                                    fixed_y_range=False)
         return html.Div([dcc.Graph(figure=plotly_fig,
                                    id=app_id_dict['plot_fig_id'])]), output_style, data_fb
     else:
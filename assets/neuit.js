@@ -0,0 +1,110 @@
+// Clientside callbacks of NEUIT, registered with dash.dependencies.ClientsideFunction('neuit', <name>)
+// The option tables are in window.neuitTables, served from _utilities.py by 'get_clientside_tables_js'
+
+function energyToX(energy, xType, distanceM) {
+    if (xType === 'energy') {
+        return energy;
+    }
+    // Same constants as ImagingReso.ev_to_angstroms and ImagingReso.ev_to_s
+    var wavelength = Math.sqrt(81.787 / (energy * 1000.));
+    if (xType === 'lambda') {
+        return wavelength;
+    }
+    return wavelength * distanceM / 3956. * 1e6;  // time-of-flight in us
+}
+
+function withDisplay(style, shown) {
+    return Object.assign({}, style, {display: shown ? 'block' : 'none'});
+}
+
+// Same as _utilities.get_plot_axis_types
+function plotAxisTypes(plotScale, yType) {
+    var logY = plotScale === 'logy' || plotScale === 'loglog';
+    if (window.neuitTables.fixed_y_types.indexOf(yType) !== -1 && logY) {
+        plotScale = 'linear';
+        logY = false;
+    }
+    return {
+        x: (plotScale === 'logx' || plotScale === 'loglog') ? 'log' : 'linear',
+        y: logY ? 'log' : 'linear',
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    neuit: {
+        show_hide_iso_table: function (isoChanged, style) {
+            return withDisplay(style, isoChanged.length === 1);
+        },
+
+        // Restarts the isotope table interval for one more firing, so a burst of edits or an upload updates
+        // the isotope table once, 'iso_update_delay_ms' after the last edit. dcc.Interval only restarts its timer
+        // when 'interval' changes, which is moved by 1 ms back and forth for that.
+        schedule_iso_update: function (database, sampleRows, interval, nIntervals) {
+            return [interval % 2 ? interval - 1 : interval + 1, (nIntervals || 0) + 1];
+        },
+
+        show_hide_band_input: function (beamline, style) {
+            return withDisplay(style, window.neuitTables.band_hidden_beamlines.indexOf(beamline) === -1);
+        },
+
+        show_band_units: function (bandType) {
+            return window.neuitTables.band_units[bandType === 'lambda' ? 'lambda' : 'energy'];
+        },
+
+        show_output_div: function (nSubmit, testPassed) {
+            return withDisplay({}, nSubmit !== null && nSubmit !== undefined && testPassed === true);
+        },
+
+        disable_show_options: function (yType) {
+            return window.neuitTables.show_opt_options[yType];
+        },
+
+        disable_plot_scale_options: function (yType) {
+            return window.neuitTables.plot_scale_options[yType];
+        },
+
+        // Returns the figure of a store whose x values are energies, with x converted to 'xType'
+        // and the axis types of 'plotScale'
+        render_reso_fig: function (storedFig, xType, plotScale, yType) {
+            if (!storedFig) {
+                return window.dash_clientside.no_update;
+            }
+            var meta = storedFig.layout.meta;
+            var convert = function (energy) {
+                return energyToX(energy, xType, meta.distance_m);
+            };
+            var fig = {
+                data: storedFig.data.map(function (trace) {
+                    return Object.assign({}, trace, {x: trace.x.map(convert)});
+                }),
+                layout: Object.assign({}, storedFig.layout, {uirevision: xType + '/' + plotScale}),
+            };
+            var axisTypes = plotAxisTypes(plotScale, yType);
+            var xaxis = Object.assign({}, storedFig.layout.xaxis, {type: axisTypes.x});
+            xaxis.title = Object.assign({}, xaxis.title, {text: meta.x_tag_dict[xType]});
+            if (meta.x_window) {
+                var xRange = meta.x_window.map(convert).sort(function (a, b) { return a - b; });
+                if (xaxis.type === 'log') {
+                    xRange = xRange.map(Math.log10);
+                }
+                xaxis.autorange = false;
+                xaxis.range = xRange;
+            } else {
+                xaxis.autorange = true;
+            }
+            var yaxis = Object.assign({}, storedFig.layout.yaxis, {type: axisTypes.y});
+            if (meta.y_window && meta.y_window.axis_type === axisTypes.y) {
+                yaxis.autorange = false;
+                yaxis.range = meta.y_window.range;
+            } else if (window.neuitTables.fixed_y_types.indexOf(yType) !== -1) {
+                yaxis.autorange = false;
+                yaxis.range = window.neuitTables.fixed_y_range;
+            } else {
+                yaxis.autorange = true;
+            }
+            fig.layout.xaxis = xaxis;
+            fig.layout.yaxis = yaxis;
+            return fig;
+        },
+    },
+});
@@ -5,10 +5,11 @@ import matplotlib as mpl
 
 mpl.use('agg')  # this is to fix the matplotlib backend
 
-from _utilities import app_links_div, app_dict
+from _utilities import app_links_div, app_dict, use_xs_store
 from _app import app
 from apps import app1, app2, app3, app4, app5
 
+use_xs_store()  # memory-map the packed cross-sections if built, shared by workers when started with '--preload'
 server = app.server
 
 app.layout = html.Div(
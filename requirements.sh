@@ -8,4 +8,5 @@ pip install pandas>=1.1.3
 pip install numpy==1.19.2
 pip install scipy>=1.5.2
 pip install cerberus==1.3.2
-pip install gunicorn==20.0.4
\ No newline at end of file
+pip install gunicorn==20.0.4
+python -c "import _utilities; _utilities.build_xs_store()"  # pack the cross-sections once, mapped by index.py
@@ -1,7 +1,9 @@
 import unittest
+from unittest import mock
 
 from _utilities import *
-from _utilities import _validate_chem_name
+from _utilities import _validate_chem_name, _validate_tb_columns, _validate_input, _calculate_transmission_batch, \
+    _reso_cache, _ir_get_database_data, _xs_store
 
 
 class TestUtilities(unittest.TestCase):
@@ -182,6 +184,323 @@ class TestUtilities(unittest.TestCase):
         passed, output_div = validate_sum_of_iso_ratio(iso_df=test_df)
         self.assertEqual([True], passed)
 
+    def test_init_reso_cache(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        kwargs = dict(e_min=1, e_max=10, database=self.database, sample_tb_df=sample_df, iso_tb_df=iso_df)
+        o_reso = init_reso(e_step=0.1, **kwargs)
+        self.assertIs(init_reso(e_step=0.1, **kwargs), o_reso)
+        key_list = list(_reso_cache.keys())
+        # One-off builds are not cached, cached ones are still reused
+        one_off_reso = init_reso(e_step=0.2, use_cache=False, **kwargs)
+        self.assertIsNot(init_reso(e_step=0.2, use_cache=False, **kwargs), one_off_reso)
+        self.assertIs(init_reso(e_step=0.1, use_cache=False, **kwargs), o_reso)
+        chunk_list = list(iter_reso_sigma_chunks(e_min=1, e_max=10, e_step=0.001, database=self.database,
+                                                 sample_tb_dict=sample_df.to_dict('list'),
+                                                 iso_tb_dict=iso_df.to_dict('list'), iso_changed=[],
+                                                 distance_m=distance_default))
+        self.assertEqual(len(chunk_list), 2)
+        self.assertEqual(list(_reso_cache.keys()), key_list)
+
+    def test_calculate_transmission_batch(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''},
+                                  {chem_name: 'CoAg', thick_name: 0.2, density_name: 5},
+                                  {chem_name: 'UO3', thick_name: 0.05, density_name: ''}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        total_trans, o_stack = calculate_transmission(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[],
+                                                      beamline='imaging', band_min=None, band_max=None,
+                                                      band_type='lambda', database=self.database)
+        e_min, e_max = get_beam_energy_range(beamline='imaging', band_min=None, band_max=None, band_type='lambda')
+        o_reso = init_reso(e_min=e_min, e_max=e_max, e_step=(e_max - e_min) / (linear_nbr_point - 1),
+                           database=self.database, sample_tb_df=sample_df, iso_tb_df=iso_df)
+        energy = o_reso.total_signal['energy_eV'].round(6)
+        flux = get_beam_shape(beamline='imaging')[1](energy)
+        flux_df = pd.DataFrame({'energy_eV': energy, 'flux': flux})
+        layer_list = list(o_stack.keys())
+        trans_list = [o_reso.stack_signal[each_layer]['transmission'] for each_layer in layer_list]
+        batch_trans = _calculate_transmission_batch(flux_df=flux_df, trans_matrix=np.vstack(trans_list))
+        integr_total = np.trapz(y=flux / energy, x=energy).round(3)
+        for each_layer, each_trans, each_batch_trans in zip(layer_list, trans_list, batch_trans):
+            # Each layer integrated alone
+            _trans = np.trapz(y=each_trans * flux / energy, x=energy).round(3) / integr_total * 100
+            self.assertAlmostEqual(each_batch_trans, _trans)
+            self.assertAlmostEqual(o_stack[each_layer]['transmission'], _trans)
+        _trans = np.trapz(y=o_reso.total_signal['transmission'] * flux / energy, x=energy).round(3)
+        self.assertAlmostEqual(total_trans, _trans / integr_total * 100)
+
+    def test_validate_tb_columns(self):
+        sample_schema = copy.deepcopy(sample_dict_schema)
+        sample_schema[chem_name].pop('ENDF_VIII')  # the chemical formula rule needs the ENDF databases
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''},
+                                  {chem_name: 'CoC', thick_name: 1, density_name: 5},
+                                  {chem_name: '', thick_name: 1, density_name: ''},
+                                  {chem_name: 'Ag', thick_name: -1, density_name: ''},
+                                  {chem_name: 'Ag', thick_name: 1, density_name: 'A'},
+                                  {chem_name: 'Ag', thick_name: 1, density_name: -2},
+                                  {chem_name: 'Ag', thick_name: '1', density_name: ''},
+                                  {chem_name: 12, thick_name: 1, density_name: ''}])
+        iso_schema = copy.deepcopy(iso_dict_schema)
+        iso_schema[layer_name].pop('ENDF_VIII')
+        iso_df = pd.DataFrame([{layer_name: 'Ag', ele_name: 'Ag', iso_name: '107-Ag', iso_ratio_name: 0.5},
+                               {layer_name: 'Ag', ele_name: 'Ag', iso_name: '109-Ag', iso_ratio_name: 1},
+                               {layer_name: 'Ag', ele_name: 'Ag', iso_name: '', iso_ratio_name: 0.5},
+                               {layer_name: 'Ag', ele_name: 'Ag', iso_name: '109-Ag', iso_ratio_name: -1},
+                               {layer_name: 'Ag', ele_name: 'Ag', iso_name: '109-Ag', iso_ratio_name: 1.5},
+                               {layer_name: 'Ag', ele_name: 'Ag', iso_name: '109-Ag', iso_ratio_name: ''},
+                               {layer_name: '', ele_name: 12, iso_name: '109-Ag', iso_ratio_name: 0}])
+        for each_schema, each_df, each_expected_list in [
+                (sample_schema, sample_df, [True, True, False, False, False, False, False, False]),
+                (iso_schema, iso_df, [True, True, False, False, False, False, False])]:
+            self.assertEqual(_validate_tb_columns(schema=each_schema, input_df=each_df).tolist(), each_expected_list)
+            # Same pass/fail and messages as 'MyValidator' alone
+            v = MyValidator(each_schema)
+            expected_list = [_validate_input(v=v, input_dict=each) for each in each_df.to_dict('records')]
+            passed_list, div_list = validate_input_tb_rows(schema=each_schema, input_df=each_df)
+            self.assertEqual(passed_list, [each[0] for each in expected_list])
+            self.assertEqual(passed_list, each_expected_list)
+            self.assertEqual([str(each) for each in div_list], [str(each[1]) for each in expected_list])
+
+    def test_calculate_transmission_adaptive(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''},
+                                  {chem_name: 'CoAg', thick_name: 0.2, density_name: 5}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        linear_trans, linear_stack = calculate_transmission(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[],
+                                                            beamline='snap', band_min=0.5, band_max=2,
+                                                            band_type='lambda', database=self.database)
+        total_trans, o_stack, achieved_error = calculate_transmission_adaptive(sample_tb_df=sample_df,
+                                                                               iso_tb_df=iso_df,
+                                                                               iso_changed=[],
+                                                                               beamline='snap',
+                                                                               band_min=0.5,
+                                                                               band_max=2,
+                                                                               band_type='lambda',
+                                                                               database=self.database,
+                                                                               tol=0.001)
+        self.assertLessEqual(achieved_error, 0.001)
+        self.assertAlmostEqual(total_trans, linear_trans, delta=0.1)
+        self.assertAlmostEqual(o_stack['CoAg']['Co']['transmission'], linear_stack['CoAg']['Co']['transmission'],
+                               delta=0.1)
+
+    def test_integration_convergence(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''},
+                                  {chem_name: 'CoAg', thick_name: 0.2, density_name: 5}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        kwargs = dict(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[], beamline='imaging', band_min=None,
+                      band_max=None, band_type='lambda', database=self.database)
+        ref_trans, _, achieved_error = calculate_transmission_adaptive(tol=1e-6, max_points=200000, **kwargs)
+        self.assertLessEqual(achieved_error, 1e-6)
+        linear_error = abs(calculate_transmission(**kwargs)[0] - ref_trans)
+        for each_method in ['log_trapz', 'simpson', 'gauss']:
+            error = abs(calculate_transmission(integration=each_method, nbr_point=quadrature_nbr_point, **kwargs)[0]
+                        - ref_trans)
+            self.assertLess(error, 1e-3)
+            self.assertLess(error, linear_error / 10)
+        # The quadrature shown by app1 converges with the number of nodes
+        error_list = [abs(calculate_transmission(integration=quadrature_integration, nbr_point=each_nbr, **kwargs)[0]
+                          - ref_trans) for each_nbr in [51, quadrature_nbr_point, 401]]
+        self.assertLess(error_list[1], error_list[0])
+        self.assertLess(error_list[2], error_list[1])
+
+    def test_calculate_transmission_all(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''},
+                                  {chem_name: 'CoAg', thick_name: 0.2, density_name: 5}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        kwargs = dict(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[], band_min=0.5, band_max=2,
+                      band_type='lambda', database=self.database)
+        try:
+            result_dict = calculate_transmission_all(beamline_list=['imaging', 'snap'], **kwargs)
+        finally:
+            shutdown_transmission_pool()
+        # Same numbers as the result of each beamline alone
+        for each_beamline, (total_trans, o_stack) in result_dict.items():
+            output_div_list, _o_stack = form_transmission_result_div(beamline=each_beamline,
+                                                                     grid=get_transmission_grid(each_beamline),
+                                                                     **kwargs)
+            self.assertEqual(output_div_list[2].children, 'Transmission (total): {} %'.format(round(total_trans, 3)))
+            self.assertAlmostEqual(o_stack['CoAg']['transmission'], _o_stack['CoAg']['transmission'])
+
+    def test_solve_thickness(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 0.1, density_name: ''},
+                                  {chem_name: 'CoAg', thick_name: 0.2, density_name: 5}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        stack_sweep_dict = init_thickness_sweep(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[],
+                                                beamline='snap', band_min=0.5, band_max=2, band_type='lambda',
+                                                database=self.database)
+        sweep_dict = get_layer_sweep(stack_sweep_dict=stack_sweep_dict, layer='Ag')
+        total_trans, o_stack = calculate_transmission(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[],
+                                                      beamline='snap', band_min=0.5, band_max=2, band_type='lambda',
+                                                      database=self.database, integration=quadrature_integration,
+                                                      nbr_point=quadrature_nbr_point)
+        self.assertAlmostEqual(sweep_thickness(sweep_dict=sweep_dict, thickness_list=[0.1])[0], total_trans)
+        thickness = solve_thickness(sweep_dict=sweep_dict, target_trans=50)
+        self.assertAlmostEqual(sweep_thickness(sweep_dict=sweep_dict, thickness_list=[thickness])[0], 50)
+        self.assertRaises(ValueError, solve_thickness, sweep_dict=sweep_dict, target_trans=99)
+        self.assertRaises(ValueError, get_layer_sweep, stack_sweep_dict=stack_sweep_dict, layer='Co')
+        # Solved on the grid of the linear result, which then shows the target
+        stack_sweep_dict = init_thickness_sweep(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[],
+                                                beamline='imaging', band_min=None, band_max=None, band_type='lambda',
+                                                database=self.database, grid='linear')
+        thickness = solve_thickness(sweep_dict=get_layer_sweep(stack_sweep_dict=stack_sweep_dict, layer='Ag'),
+                                    target_trans=50)
+        sample_df.loc[0, thick_name] = thickness
+        total_trans = calculate_transmission(sample_tb_df=sample_df, iso_tb_df=iso_df, iso_changed=[],
+                                             beamline='imaging', band_min=None, band_max=None, band_type='lambda',
+                                             database=self.database)[0]
+        self.assertAlmostEqual(total_trans, 50, places=3)
+
+    def test_encode_decode_df(self):
+        test_df = pd.DataFrame({energy_name: np.linspace(1, 100, 11),
+                                'Total_transmission': np.linspace(0, 1, 11),
+                                'index': np.arange(11),
+                                'count': np.arange(11, dtype=np.uint64) + 2 ** 63,
+                                'flag': np.arange(11) % 2 == 0,
+                                'Ag/Ag/107-Ag': ['a'] * 11})
+        encoded = json.loads(json.dumps(encode_df(test_df)))
+        self.assertTrue(decode_df(encoded).equals(test_df))
+        encoded = encode_df(test_df, float_dtype='<f4')
+        decoded_df = decode_df(encoded)
+        self.assertEqual(list(decoded_df.columns), list(test_df.columns))
+        self.assertTrue(np.allclose(decoded_df[energy_name], test_df[energy_name]))
+
+    def test_save_load_result(self):
+        df_dict = {'x': pd.DataFrame({energy_name: np.linspace(1, 100, 11), 'index': np.arange(11)}),
+                   'y': pd.DataFrame({'Total_transmission': np.linspace(0, 1, 11), 'Ag': np.linspace(1, 0, 11)})}
+        with tempfile.TemporaryDirectory() as store_dir:
+            with mock.patch('_utilities.result_store_dir', store_dir):
+                # Read back from disk, as by another worker
+                result_id = save_result(df_dict=df_dict, meta={'e_step': 0.01}, keep_in_memory=False)
+                self.assertTrue(has_result(result_id))
+                self.assertTrue(os.path.exists(os.path.join(store_dir, result_id + '.npz')))
+                loaded_dict = load_result(result_id=result_id)
+                self.assertEqual(list(loaded_dict.keys()), ['x', 'y'])
+                for each_name, each_df in df_dict.items():
+                    self.assertTrue(loaded_dict[each_name].equals(each_df))
+                self.assertEqual(load_result_meta(result_data=result_id), {'e_step': 0.01})
+                # Unknown and malformed ids
+                self.assertFalse(has_result(uuid.uuid4().hex))
+                self.assertIsNone(load_result(result_id=uuid.uuid4().hex))
+                self.assertIsNone(load_result(result_id='../x'))
+                self.assertRaises(PreventUpdate, load_dfs, result_data=uuid.uuid4().hex)
+
+    def test_get_quadrature(self):
+        for each_method in integration_method_list:
+            energy, weights = get_quadrature(method=each_method, e_min=0.01, e_max=10., nbr_point=200)
+            self.assertTrue(np.all((energy >= 0.01) & (energy <= 10.)))
+            self.assertAlmostEqual(np.sum(weights), 9.99, places=2)
+            self.assertAlmostEqual(np.sum(weights * energy ** 2), (10. ** 3 - 0.01 ** 3) / 3, delta=1.)
+            if each_method != 'trapz':
+                self.assertAlmostEqual(np.sum(weights / energy), np.log(1000.), places=3)
+
+    def test_derive_reso_y(self):
+        sample_df = pd.DataFrame([{chem_name: 'Ag', thick_name: 1, density_name: ''},
+                                  {chem_name: 'CoC', thick_name: 0.5, density_name: ''}])
+        iso_df = form_iso_table(sample_df=sample_df, database=self.database)
+        df_dict, stack_list = calculate_reso_sigma(e_min=1, e_max=100, e_step=0.1, database=self.database,
+                                                   sample_tb_dict=sample_df.to_dict('list'),
+                                                   iso_tb_dict=iso_df.to_dict('list'), iso_changed=[],
+                                                   distance_m=distance_default)
+        o_reso = init_reso(e_min=1, e_max=100, e_step=0.1, database=self.database, sample_tb_df=sample_df,
+                           iso_tb_df=iso_df)
+        for each_y_type in y_type_list:
+            expected_df = o_reso.export(y_axis=each_y_type, x_axis='energy', mixed=True, all_layers=True,
+                                        all_elements=True, all_isotopes=True, output_type='df').iloc[:, 1:]
+            df_y = derive_reso_y(df_sigma=df_dict['sigma'], stack_list=stack_list, y_type=each_y_type)
+            self.assertEqual(list(df_y.columns), list(expected_df.columns))
+            self.assertTrue(np.allclose(df_y.to_numpy(), expected_df.to_numpy(dtype=float), rtol=1e-12, atol=0))
+
+    def test_split_energy_range(self):
+        chunk_list = split_energy_range(e_min=1, e_max=100, e_step=0.01, max_points=1000)
+        self.assertEqual(len(chunk_list), 10)
+        self.assertEqual(chunk_list[0][0], 1)
+        self.assertEqual(chunk_list[-1][1], 100)
+        for (_e_min, _e_max), (_next_e_min, _) in zip(chunk_list[:-1], chunk_list[1:]):
+            self.assertEqual(_e_max, _next_e_min)
+            self.assertAlmostEqual(_e_max - _e_min, 999 * 0.01)
+        self.assertEqual(split_energy_range(e_min=1, e_max=2, e_step=0.1, max_points=1000), [(1, 2)])
+
+    def test_minmax_downsample(self):
+        rng = np.random.RandomState(0)
+        for each_len in [11, 1001, 3601, 7777, 100001]:
+            y = rng.standard_normal(each_len)
+            for each_max in [1, 2, 3, 5, 7, 100, 3600, 3601]:
+                index = minmax_downsample(y=y, max_points=each_max)
+                self.assertLessEqual(len(index), each_max)
+                self.assertTrue(np.all(np.diff(index) > 0))
+                if each_len <= each_max:
+                    self.assertEqual(len(index), each_len)
+                elif each_max >= 4:
+                    self.assertEqual([index[0], index[-1]], [0, each_len - 1])
+                    self.assertIn(np.argmin(y), index)
+                    self.assertIn(np.argmax(y), index)
+
+    def test_update_new_iso_table(self):
+        prev_iso_df = form_iso_table(sample_df=pd.DataFrame([{chem_name: 'Ag'}, {chem_name: 'CoC'}]),
+                                     database=self.database)
+        prev_iso_df[iso_ratio_name] = prev_iso_df[iso_ratio_name].astype(object)
+        prev_iso_df.loc[0, iso_ratio_name] = 0.3
+        prev_iso_df.loc[1, iso_ratio_name] = 0.7
+        new_iso_df = form_iso_table(sample_df=pd.DataFrame([{chem_name: 'CoC'}, {chem_name: 'H'}, {chem_name: 'Ag'}]),
+                                    database=self.database)
+        new_iso_df = update_new_iso_table(prev_iso_df=prev_iso_df, new_iso_df=new_iso_df)
+        ag_ratio_list = new_iso_df[new_iso_df[layer_name] == 'Ag'][iso_ratio_name].tolist()
+        self.assertEqual(ag_ratio_list[:2], [0.3, 0.7])
+        natural_iso_df = form_iso_table(sample_df=pd.DataFrame([{chem_name: 'CoC'}, {chem_name: 'H'}]),
+                                        database=self.database)
+        self.assertEqual(new_iso_df[iso_ratio_name].tolist()[:len(natural_iso_df)],
+                         natural_iso_df[iso_ratio_name].tolist())
+        # A layer whose isotopes are not the previous ones gets the natural ratios
+        natural_iso_df = form_iso_table(sample_df=pd.DataFrame([{chem_name: 'Ag'}]), database=self.database)
+        new_iso_df = update_new_iso_table(prev_iso_df=prev_iso_df.drop(index=2), new_iso_df=natural_iso_df.copy())
+        self.assertEqual(new_iso_df[iso_ratio_name].tolist(), natural_iso_df[iso_ratio_name].tolist())
+
+    def test_update_iso_table_callback(self):
+        sample_tb_rows = [{chem_name: 'Ag', thick_name: 1, density_name: ''}]
+        iso_tb_rows, update_key = update_iso_table_callback(sample_tb_rows=sample_tb_rows, prev_iso_tb_rows=[],
+                                                            database=self.database)
+        self.assertEqual(iso_tb_rows, form_iso_table(sample_df=pd.DataFrame(sample_tb_rows),
+                                                     database=self.database).to_dict('records'))
+        # Editing a thickness does not update the isotope table
+        sample_tb_rows[0][thick_name] = 2
+        self.assertRaises(PreventUpdate, update_iso_table_callback, sample_tb_rows=sample_tb_rows,
+                          prev_iso_tb_rows=iso_tb_rows, database=self.database, prev_update_key=update_key)
+        # Same rows from another sample table: only the key is updated
+        self.assertEqual(update_iso_table_callback(sample_tb_rows=sample_tb_rows + [{chem_name: ''}],
+                                                   prev_iso_tb_rows=iso_tb_rows, database=self.database,
+                                                   prev_update_key=update_key)[0], no_update)
+        sample_tb_rows.append({chem_name: 'H', thick_name: 1, density_name: ''})
+        new_iso_tb_rows, new_update_key = update_iso_table_callback(sample_tb_rows=sample_tb_rows,
+                                                                    prev_iso_tb_rows=iso_tb_rows,
+                                                                    database=self.database,
+                                                                    prev_update_key=update_key)
+        self.assertNotEqual(new_update_key, update_key)
+        self.assertEqual(new_iso_tb_rows[:len(iso_tb_rows)], iso_tb_rows)
+        self.assertEqual({each_row[layer_name] for each_row in new_iso_tb_rows}, {'Ag', 'H'})
+
+    def test_xs_store(self):
+        file_key = self.database + '/Ag-107.csv'
+        file_name = os.path.join(ir_ref_data_path, self.database, 'Ag-107.csv')
+        expected_df = _ir_get_database_data(file_name=file_name)
+        with tempfile.TemporaryDirectory() as store_dir:
+            store_path = os.path.join(store_dir, '_packed_xs')
+            self.assertEqual(load_xs_store(store_path=store_path), (None, None))
+            index_dict = build_xs_store(database_list=[self.database], store_path=store_path)
+            self.assertIn(file_key, index_dict)
+            self.assertEqual(sorted(os.listdir(store_dir)), ['_packed_xs.bin', '_packed_xs.json'])
+            xs_array, index_dict = load_xs_store(store_path=store_path)
+            offset, length = index_dict[file_key]
+            self.assertTrue(np.array_equal(xs_array[offset:offset + length], expected_df['E_eV']))
+            self.assertTrue(np.array_equal(xs_array[offset + length:offset + 2 * length], expected_df['Sig_b']))
+            expected_sigma_dict = ir_util.get_sigma(database_file_name=file_name, e_min=1, e_max=100, e_step=0.1)
+            # As hooked by index.py
+            with mock.patch('_utilities.xs_store_path', store_path):
+                try:
+                    self.assertTrue(use_xs_store())
+                    sigma_dict = ir_util.get_sigma(database_file_name=file_name, e_min=1, e_max=100, e_step=0.1)
+                finally:
+                    ir_util.get_database_data = _ir_get_database_data
+                    _xs_store.clear()
+        self.assertTrue(np.array_equal(sigma_dict['sigma_b'], expected_sigma_dict['sigma_b']))
+
     def test_chem_name_validator(self):
         database_endf7 = 'ENDF_VII'
         database_endf8 = 'ENDF_VIII'